@@ -0,0 +1,71 @@
+"""
+Micro-benchmark: ORM entities vs column-projected Rows for a hospital page.
+
+Runs the same ``ORDER BY id LIMIT size`` page query both ways against
+DATABASE_URL and reports time and Python allocations per request, including
+building the response models. Needs a populated hospitals table.
+
+    python -m bench.list_reads [--size 100] [--iterations 500]
+"""
+import argparse
+import asyncio
+import time
+import tracemalloc
+
+from dotenv import load_dotenv
+
+load_dotenv(override=True)
+
+from sqlalchemy import select  # noqa: E402
+
+from login import crud, db, schemas  # noqa: E402
+from login.models import Hospital  # noqa: E402
+
+
+async def orm_page(session, size: int) -> list:
+    result = await session.execute(select(Hospital).order_by(Hospital.id).limit(size))
+    return [schemas.HospitalPublic.model_validate(h) for h in result.scalars().all()]
+
+
+async def rows_page(session, size: int) -> list:
+    items, _ = await crud.list_hospitals(session, None, 1, size, with_total=False)
+    return [schemas.HospitalPublic.model_validate(h) for h in items]
+
+
+async def measure(fn, size: int, iterations: int) -> dict:
+    # a fresh session per request, like the API
+    async with db.async_session() as session:
+        await fn(session, size)  # warm up connection and statement caches
+    start = time.perf_counter()
+    for _ in range(iterations):
+        async with db.async_session() as session:
+            await fn(session, size)
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    for _ in range(20):
+        async with db.async_session() as session:
+            await fn(session, size)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"ms_per_request": elapsed / iterations * 1000, "peak_kib": peak / 1024}
+
+
+async def main(size: int, iterations: int) -> None:
+    async with db.async_session() as session:
+        rows = len(await rows_page(session, size))
+    print(f"page size {size} ({rows} rows), {iterations} iterations")
+    for name, fn in (("orm", orm_page), ("rows", rows_page)):
+        stats = await measure(fn, size, iterations)
+        print(
+            f"{name:5} {stats['ms_per_request']:7.3f} ms/request  peak {stats['peak_kib']:8.1f} KiB"
+        )
+    await db.engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--size", type=int, default=100)
+    parser.add_argument("--iterations", type=int, default=500)
+    args = parser.parse_args()
+    asyncio.run(main(args.size, args.iterations))
@@ -11,9 +11,16 @@ from dotenv import load_dotenv
 load_dotenv(override=True)
 
 from login import db, models
+from login.auth_cache import principal_cache, user_change_listener
+from login.dispatch import dispatcher
+from login.maintenance import token_reaper
+from login.pubsub import broker
+from login import hospital_cache
+from login.security import hasher
 from login.routers import (
     auth_router,
     autocall_router,
+    beds_router,
     family_router,
     hospitals_router,
     profiles_router,
@@ -34,7 +41,31 @@ app.add_middleware(
 @app.on_event("startup")
 async def on_startup():
     # DB schema is managed manually via db_init.sql
-    pass
+    await dispatcher.start()
+    token_reaper.start()
+    hospital_cache.reload_listener.start()
+    user_change_listener.start()
+
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    await dispatcher.stop()
+    await token_reaper.stop()
+    await hospital_cache.reload_listener.stop()
+    await user_change_listener.stop()
+    hasher.shutdown()
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    return {
+        "hashing": hasher.stats(),
+        "principal_cache": principal_cache.stats(),
+        "user_change_listener": user_change_listener.stats(),
+        "hospitals": hospital_cache.stats(),
+        "pubsub": broker.stats(),
+        "token_reaper": token_reaper.stats(),
+    }
 
 def normalize_prefix(prefix: str) -> str:
     p = prefix.strip()
@@ -50,6 +81,8 @@ api_prefix = normalize_prefix(os.getenv("API_PREFIX", "/api/v1"))
 app.include_router(auth_router, prefix=api_prefix)
 app.include_router(users_router, prefix=api_prefix)
 app.include_router(profiles_router, prefix=api_prefix)
+# before hospitals_router, whose /hospitals/{hospital_id} catch-all would take /hospitals/bed-status
+app.include_router(beds_router, prefix=api_prefix)
 app.include_router(hospitals_router, prefix=api_prefix)
 app.include_router(family_router, prefix=api_prefix)
 app.include_router(autocall_router, prefix=api_prefix)
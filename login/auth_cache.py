@@ -0,0 +1,106 @@
+"""
+In-process auth state shared by security (readers) and crud (writers).
+Kept free of crud/security imports so both sides can use it.
+
+crud also sends a NOTIFY on USER_CHANGE_CHANNEL when it revokes a user's
+sessions or changes the user, which UserChangeListener applies to this state
+in every API process.
+"""
+import os
+import time
+
+from login.cache import TTLCache
+from login.notify import NotifyListener
+
+USER_CHANGE_CHANNEL = "users_changed"
+USER_CHANGE_LISTEN = os.getenv("USER_CHANGE_LISTEN", "1") == "1"
+
+
+class RevocationList:
+    """Per-user markers meaning "access tokens issued up to now are suspect".
+
+    Stateless tokens are trusted without a DB query unless their user has a
+    marker newer than the token's ``iat``. Markers only need to outlive the
+    access token lifetime, after which every older token has expired anyway.
+    The list is per process; UserChangeListener copies the marks made by
+    other processes, and ``mark_all`` stands in for marks it may have missed.
+    """
+
+    def __init__(self, ttl_seconds: float) -> None:
+        self.ttl_seconds = ttl_seconds
+        self._marks: dict[int, float] = {}
+        self._all_marked_at = 0.0
+
+    def __len__(self) -> int:
+        return len(self._marks)
+
+    def _purge(self, now: float) -> None:
+        cutoff = now - self.ttl_seconds
+        for user_id in [u for u, t in self._marks.items() if t < cutoff]:
+            del self._marks[user_id]
+
+    def mark(self, user_id: int) -> None:
+        now = time.time()
+        self._purge(now)
+        self._marks[user_id] = now
+
+    def mark_all(self) -> None:
+        self._all_marked_at = time.time()
+
+    def is_suspect(self, user_id: int, issued_at: float | None) -> bool:
+        marked_at = max(self._marks.get(user_id, 0.0), self._all_marked_at)
+        if time.time() - marked_at > self.ttl_seconds:
+            self._marks.pop(user_id, None)
+            return False
+        return issued_at is None or issued_at <= marked_at
+
+
+revocations = RevocationList(ttl_seconds=int(os.getenv("ACCESS_EXPIRE_MIN", "30")) * 60)
+
+# user id -> users.session_gen. Tokens carry the generation they were issued
+# under ("gen" claim); bumping it revokes all of them at once. Other processes
+# drop their entry when UserChangeListener relays the bump; without the
+# listener, "db" auth mode sees it once the entry expires, and "stateless" mode
+# only when the tokens expire.
+session_gens = TTLCache(
+    maxsize=int(os.getenv("SESSION_GEN_CACHE_SIZE", "10000")),
+    ttl=float(os.getenv("SESSION_GEN_CACHE_TTL", "30")),
+)
+
+# user id -> schemas.UserPublic, used by get_current_user in "db" auth mode.
+principal_cache = TTLCache(
+    maxsize=int(os.getenv("PRINCIPAL_CACHE_SIZE", "0")),
+    ttl=float(os.getenv("PRINCIPAL_CACHE_TTL", "60")),
+)
+
+
+def forget_user(user_id: int, revoked: bool) -> None:
+    """Drop the user's cached principal; ``revoked`` also distrusts their tokens."""
+    principal_cache.invalidate(user_id)
+    if revoked:
+        session_gens.invalidate(user_id)
+        revocations.mark(user_id)
+
+
+class UserChangeListener(NotifyListener):
+    """Applies "revoked:<user id>" and "updated:<user id>" NOTIFYs from crud.
+
+    After a reconnect every cached entry goes, and every token issued so far
+    is checked against the DB until it expires, since a revocation may have
+    been missed meanwhile.
+    """
+
+    channel = USER_CHANGE_CHANNEL
+    name = "user change"
+
+    def on_notify(self, payload: str) -> None:
+        kind, _, user_id = payload.partition(":")
+        forget_user(int(user_id), revoked=kind == "revoked")
+
+    def on_reconnect(self) -> None:
+        session_gens.clear()
+        principal_cache.clear()
+        revocations.mark_all()
+
+
+user_change_listener = UserChangeListener(enabled=USER_CHANGE_LISTEN)
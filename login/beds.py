@@ -0,0 +1,57 @@
+"""
+Live ER bed status.
+
+A bed feed posts per-hospital changes to is_open, er_beds and operating_rooms.
+Each batch is written with one UPDATE. The rows that actually changed are then
+patched into the in-process ranking columns and geo index, instead of
+rebuilding them, and published on the pub/sub broker for the SSE stream. Reads
+served from the hospital snapshot take their bed fields from the ranking
+columns (see login/snapshot.py).
+
+The broker is in-process, so with several API workers only the worker that
+took the POST pushes the change. The others catch up at their next index
+refresh (HOSPITAL_RANKING_REFRESH_SEC). publish_bed_changes is the single
+place to swap in a cross-process channel such as Postgres NOTIFY.
+"""
+import hmac
+import os
+from datetime import datetime, timezone
+
+from login.geo import hospital_geo
+from login.pubsub import Broker, broker
+from login.ranking import hospital_ranking
+
+# shared secret for X-Bed-Feed-Key; the update endpoint is disabled while empty
+BED_FEED_SECRET = os.getenv("BED_FEED_SECRET", "")
+BED_EVENTS_TOPIC = "hospital_beds"
+
+
+def check_feed_key(key: str | None) -> bool:
+    return bool(BED_FEED_SECRET) and key is not None and hmac.compare_digest(
+        key.encode(), BED_FEED_SECRET.encode()
+    )
+
+
+def bed_status(row) -> dict:
+    return {
+        "hospital_id": row.id,
+        "is_open": row.is_open,
+        "er_beds": row.er_beds,
+        "operating_rooms": row.operating_rooms,
+    }
+
+
+def publish_bed_changes(rows, events: Broker = broker) -> None:
+    """Patch the in-process indexes with changed rows and notify subscribers."""
+    if not rows:
+        return
+    hospital_ranking.apply(rows)
+    hospital_geo.apply(rows)
+    events.publish(
+        BED_EVENTS_TOPIC,
+        {
+            "type": "beds",
+            "hospitals": [bed_status(r) for r in rows],
+            "at": datetime.now(timezone.utc).isoformat(),
+        },
+    )
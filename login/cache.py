@@ -0,0 +1,146 @@
+import asyncio
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Callable, Hashable
+
+
+class TTLCache:
+    """Bounded LRU cache whose entries also expire after ``ttl`` seconds.
+
+    Not thread-safe; it is meant to be used from the event loop only.
+    A ``maxsize`` of 0 disables the cache (every lookup is a miss).
+    """
+
+    def __init__(self, maxsize: int, ttl: float) -> None:
+        self.maxsize = max(0, maxsize)
+        self.ttl = ttl
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._data[key]
+            self.expirations += 1
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        if not self.maxsize:
+            return
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, key: Hashable) -> None:
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+class RefreshingIndex(ABC):
+    """Holds an in-process index built from a DB query and rebuilds it when stale.
+
+    Subclasses implement ``load`` (runs the query) and ``build`` (turns the
+    rows into the index; runs in a thread). A stale index keeps serving while
+    its replacement is built in the background; only the very first lookup
+    waits for a build.
+
+    ``patch`` applies small changes in place (through ``apply``); changes
+    applied while a rebuild is running are replayed onto the new index, since
+    its rows may have been read before them.
+    """
+
+    def __init__(self, refresh_sec: float, session_factory: Callable) -> None:
+        self.refresh_sec = refresh_sec
+        self.session_factory = session_factory
+        self.index: Any = None
+        self.built_at: float | None = None
+        self.rebuilds = 0
+        self.patches = 0
+        self._lock = asyncio.Lock()
+        self._refresh_task: asyncio.Task | None = None
+        self._replay: list | None = None
+
+    @abstractmethod
+    async def load(self, session) -> Any:
+        ...
+
+    @abstractmethod
+    def build(self, rows: Any) -> Any:
+        ...
+
+    @abstractmethod
+    def patch(self, index: Any, changes: Any) -> None:
+        ...
+
+    def apply(self, changes: Any) -> None:
+        if self._replay is not None:
+            self._replay.append(changes)
+        if self.index is not None:
+            self.patch(self.index, changes)
+            self.patches += 1
+
+    def invalidate(self) -> None:
+        self.index = None
+        self.built_at = None
+
+    def _is_stale(self) -> bool:
+        return self.built_at is None or time.monotonic() - self.built_at > self.refresh_sec
+
+    async def rebuild(self, session) -> Any:
+        async with self._lock:
+            self._replay = []
+            try:
+                rows = await self.load(session)
+                index = await asyncio.to_thread(self.build, rows)
+                for changes in self._replay:
+                    self.patch(index, changes)
+            finally:
+                self._replay = None
+            self.index = index
+            self.built_at = time.monotonic()
+            self.rebuilds += 1
+            return self.index
+
+    async def _background_rebuild(self) -> None:
+        async with self.session_factory() as session:
+            await self.rebuild(session)
+
+    async def get_index(self, session) -> Any:
+        if self.index is None:
+            async with self._lock:
+                index = self.index
+            return index if index is not None else await self.rebuild(session)
+        if self._is_stale() and (self._refresh_task is None or self._refresh_task.done()):
+            self._refresh_task = asyncio.create_task(self._background_rebuild())
+        return self.index
@@ -1,9 +1,44 @@
+import hashlib
 from datetime import datetime
 
-from sqlalchemy import delete, func, select, update
+from sqlalchemy import (
+    REAL,
+    Boolean,
+    Integer,
+    Row,
+    and_,
+    cast,
+    column,
+    delete,
+    func,
+    insert,
+    literal_column,
+    or_,
+    select,
+    text,
+    update,
+    values,
+)
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
-
+from sqlalchemy.orm import contains_eager, joinedload
+
+from login.auth_cache import (
+    USER_CHANGE_CHANNEL,
+    forget_user,
+    principal_cache,
+    revocations,
+    session_gens,
+)
+from login.db import CONNECTION_ERRORS
+from login.geo import HOSPITAL_GEO_BACKEND, hospital_geo
+from login.hospital_cache import total_cache
 from login.models import Hospital, RefreshToken, User, UserFamily, UserProfile
+from login.notify import notify
+from login.ranking import hospital_ranking
+from login.search import HOSPITAL_SEARCH_BACKEND, hospital_search
+from login.snapshot import hospital_snapshot
 
 
 async def get_user_by_email(session: AsyncSession, email: str) -> User | None:
@@ -16,46 +51,164 @@ async def get_user_by_id(session: AsyncSession, user_id: int) -> User | None:
     return result.scalar_one_or_none()
 
 
-async def create_user(session: AsyncSession, email: str, password_hash: str) -> User:
-    user = User(email=email, password_hash=password_hash)
-    session.add(user)
-    await session.commit()
-    await session.refresh(user)
-    return user
+async def get_user_home(session: AsyncSession, user_id: int) -> User | None:
+    # user, profile and family members in one LEFT OUTER JOIN query
+    result = await session.execute(
+        select(User)
+        .outerjoin(User.family_members)
+        .options(joinedload(User.profile), contains_eager(User.family_members))
+        .where(User.id == user_id)
+        .order_by(UserFamily.id)
+    )
+    return result.unique().scalar_one_or_none()
 
 
-async def update_user(session: AsyncSession, user: User) -> User:
-    session.add(user)
+async def _write_returning(session: AsyncSession, stmt):
+    # One INSERT/UPDATE ... RETURNING round trip instead of write + commit + refresh.
+    # populate_existing overwrites any copy of the row already in the session.
+    result = await session.execute(stmt.execution_options(populate_existing=True))
+    obj = result.scalar_one_or_none()
     await session.commit()
-    await session.refresh(user)
+    return obj
+
+
+async def create_user(session: AsyncSession, email: str, password_hash: str) -> User:
+    return await _write_returning(
+        session, insert(User).values(email=email, password_hash=password_hash).returning(User)
+    )
+
+
+async def update_user(session: AsyncSession, user_id: int, **changes) -> User | None:
+    # updated_at is bumped by the column's onupdate even when nothing else changes
+    # (the NOTIFY goes out with the UPDATE's commit)
+    await notify(session, USER_CHANGE_CHANNEL, f"updated:{user_id}")
+    user = await _write_returning(
+        session, update(User).where(User.id == user_id).values(**changes).returning(User)
+    )
+    principal_cache.invalidate(user_id)
     return user
 
 
-async def delete_user(session: AsyncSession, user: User) -> None:
-    await session.delete(user)
+async def delete_user(session: AsyncSession, user_id: int) -> bool:
+    # One statement: refresh tokens, profile and family rows go through the
+    # ON DELETE CASCADE foreign keys, so no child row is loaded into Python.
+    result = await session.execute(delete(User).where(User.id == user_id).returning(User.id))
+    deleted = result.scalar_one_or_none() is not None
+    if deleted:
+        await notify(session, USER_CHANGE_CHANNEL, f"revoked:{user_id}")
     await session.commit()
+    forget_user(user_id, revoked=True)
+    return deleted
+
+
+def token_digest(token: str) -> bytes:
+    # refresh tokens are stored and looked up by SHA-256 only, never in the clear
+    return hashlib.sha256(token.encode()).digest()
 
 
 async def create_refresh_token(
-    session: AsyncSession, user_id: int, token: str, expires_at: datetime
+    session: AsyncSession, user_id: int, token: str, expires_at: datetime, session_gen: int = 0
 ) -> RefreshToken:
-    refresh = RefreshToken(user_id=user_id, token=token, expires_at=expires_at)
-    session.add(refresh)
-    await session.commit()
-    await session.refresh(refresh)
-    return refresh
+    return await _write_returning(
+        session,
+        insert(RefreshToken)
+        .values(
+            user_id=user_id,
+            token_hash=token_digest(token),
+            expires_at=expires_at,
+            session_gen=session_gen,
+        )
+        .returning(RefreshToken),
+    )
 
 
 async def get_refresh_token(session: AsyncSession, token: str) -> RefreshToken | None:
-    result = await session.execute(select(RefreshToken).where(RefreshToken.token == token))
+    result = await session.execute(
+        select(RefreshToken).where(RefreshToken.token_hash == token_digest(token))
+    )
     return result.scalar_one_or_none()
 
 
-async def revoke_refresh_token(session: AsyncSession, token_obj: RefreshToken) -> None:
+async def revoke_refresh_token(session: AsyncSession, token: str) -> None:
+    await session.execute(
+        update(RefreshToken)
+        .where(RefreshToken.token_hash == token_digest(token))
+        .values(revoked=True)
+    )
+    await session.commit()
+
+
+async def rotate_refresh_token(
+    session: AsyncSession, token: str, new_token: str, expires_at: datetime
+):
+    """Revoke ``token`` and issue ``new_token`` in one transaction.
+
+    Returns the owner (id, email, created_at, updated_at, session_gen) or None
+    when the token is unknown, expired, already used or from an older session
+    generation. The revoking UPDATE locks the
+    row, so of two concurrent refreshes with the same token only one wins.
+    Presenting an already-revoked token is treated as theft: every refresh
+    token of that user is revoked.
+    """
+    digest = token_digest(token)
+    result = await session.execute(
+        update(RefreshToken)
+        .where(
+            RefreshToken.token_hash == digest,
+            RefreshToken.revoked.is_(False),
+            RefreshToken.expires_at > func.now(),
+            RefreshToken.user_id == User.id,
+            RefreshToken.session_gen == User.session_gen,
+        )
+        .values(revoked=True)
+        .returning(User.id, User.email, User.created_at, User.updated_at, User.session_gen)
+    )
+    user = result.one_or_none()
+    if user is None:
+        reused_by = (
+            select(RefreshToken.user_id)
+            .where(RefreshToken.token_hash == digest, RefreshToken.revoked.is_(True))
+            .scalar_subquery()
+        )
+        await session.execute(
+            update(RefreshToken)
+            .where(RefreshToken.user_id == reused_by, RefreshToken.revoked.is_(False))
+            .values(revoked=True)
+        )
+        await session.commit()
+        return None
     await session.execute(
-        update(RefreshToken).where(RefreshToken.id == token_obj.id).values(revoked=True)
+        insert(RefreshToken).values(
+            user_id=user.id,
+            token_hash=token_digest(new_token),
+            expires_at=expires_at,
+            session_gen=user.session_gen,
+        )
     )
     await session.commit()
+    return user
+
+
+async def bump_session_gen(session: AsyncSession, user_id: int) -> int | None:
+    """Invalidate every access and refresh token of the user with one row update."""
+    result = await session.execute(
+        update(User)
+        .where(User.id == user_id)
+        # not a profile change, so leave updated_at alone
+        .values(session_gen=User.session_gen + 1, updated_at=User.updated_at)
+        .returning(User.session_gen)
+    )
+    gen = result.scalar_one_or_none()
+    if gen is not None:
+        # other processes drop their cached generation on commit
+        await notify(session, USER_CHANGE_CHANNEL, f"revoked:{user_id}")
+    await session.commit()
+    if gen is not None:
+        session_gens.set(user_id, gen)
+        principal_cache.invalidate(user_id)
+        # stateless tokens issued until now must be checked against the DB
+        revocations.mark(user_id)
+    return gen
 
 
 async def get_profile_by_user_id(session: AsyncSession, user_id: int) -> UserProfile | None:
@@ -74,38 +227,65 @@ async def upsert_profile(
     allergy: dict | None,
     medication: dict | None,
 ) -> tuple[UserProfile, bool]:
-    profile = await get_profile_by_user_id(session, user_id)
-    created = False
-    if not profile:
-        profile = UserProfile(
-            user_id=user_id,
-            name=name,
-            birth_date=birth_date,
-            gender=gender,
-            height=height,
-            weight=weight,
-            allergy=allergy,
-            medication=medication,
+    values = dict(
+        name=name,
+        birth_date=birth_date,
+        gender=gender,
+        height=height,
+        weight=weight,
+        allergy=allergy,
+        medication=medication,
+    )
+    if session.bind.dialect.name == "postgresql":
+        return await _upsert_profile_pg(session, user_id, values)
+
+    # portable path: try the update first; if there is no row, insert, and if a
+    # concurrent request inserted in between, retry the update once
+    for _ in range(2):
+        profile = await _write_returning(
+            session,
+            update(UserProfile)
+            .where(UserProfile.user_id == user_id)
+            .values(**values)
+            .returning(UserProfile),
         )
-        session.add(profile)
-        created = True
-    else:
-        profile.name = name
-        profile.birth_date = birth_date
-        profile.gender = gender
-        profile.height = height
-        profile.weight = weight
-        profile.allergy = allergy
-        profile.medication = medication
-        session.add(profile)
+        if profile:
+            return profile, False
+        try:
+            profile = await _write_returning(
+                session, insert(UserProfile).values(user_id=user_id, **values).returning(UserProfile)
+            )
+            return profile, True
+        except IntegrityError:
+            await session.rollback()
+    raise RuntimeError("profile upsert did not converge")
+
+
+async def _upsert_profile_pg(
+    session: AsyncSession, user_id: int, values: dict
+) -> tuple[UserProfile, bool]:
+    stmt = pg_insert(UserProfile).values(user_id=user_id, **values)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[UserProfile.user_id],
+        set_={**values, "updated_at": func.now()},
+    )
+    # xmax is 0 only for a freshly inserted row version
+    stmt = stmt.returning(UserProfile, literal_column("xmax = 0")).execution_options(
+        populate_existing=True
+    )
+    profile, created = (await session.execute(stmt)).one()
     await session.commit()
-    await session.refresh(profile)
     return profile, created
 
 
+def _changes(**fields) -> dict:
+    # PATCH semantics: None means "leave unchanged"
+    return {k: v for k, v in fields.items() if v is not None}
+
+
 async def patch_profile(
     session: AsyncSession,
-    profile: UserProfile,
+    user_id: int,
     name: str | None,
     birth_date: str | None,
     gender: str | None,
@@ -113,30 +293,98 @@ async def patch_profile(
     weight: float | None,
     allergy: dict | None,
     medication: dict | None,
-) -> UserProfile:
-    if name is not None:
-        profile.name = name
-    if birth_date is not None:
-        profile.birth_date = birth_date
-    if gender is not None:
-        profile.gender = gender
-    if height is not None:
-        profile.height = height
-    if weight is not None:
-        profile.weight = weight
-    if allergy is not None:
-        profile.allergy = allergy
-    if medication is not None:
-        profile.medication = medication
-    session.add(profile)
-    await session.commit()
-    await session.refresh(profile)
-    return profile
+) -> UserProfile | None:
+    values = _changes(
+        name=name,
+        birth_date=birth_date,
+        gender=gender,
+        height=height,
+        weight=weight,
+        allergy=allergy,
+        medication=medication,
+    )
+    return await _write_returning(
+        session,
+        update(UserProfile)
+        .where(UserProfile.user_id == user_id)
+        .values(**values)
+        .returning(UserProfile),
+    )
 
 
-async def delete_profile(session: AsyncSession, profile: UserProfile) -> None:
-    await session.delete(profile)
+async def delete_profile(session: AsyncSession, user_id: int) -> bool:
+    result = await session.execute(
+        delete(UserProfile).where(UserProfile.user_id == user_id).returning(UserProfile.id)
+    )
+    deleted = result.scalar_one_or_none() is not None
     await session.commit()
+    return deleted
+
+
+# Read paths select only the columns the API returns and hand back plain Rows
+# (attribute access like an entity, but no identity map or change tracking).
+# Hospital reads served from the mmap snapshot return SnapshotHospital tuples
+# with the same fields (see login/snapshot.py).
+HOSPITAL_COLUMNS = (
+    Hospital.id,
+    Hospital.name,
+    Hospital.is_open,
+    Hospital.distance_km,
+    Hospital.address,
+    Hospital.latitude,
+    Hospital.longitude,
+    Hospital.er_beds,
+    Hospital.operating_rooms,
+)
+FAMILY_COLUMNS = (
+    UserFamily.id,
+    UserFamily.user_id,
+    UserFamily.relationship,
+    UserFamily.name,
+    UserFamily.birth_date,
+    UserFamily.gender,
+    UserFamily.height,
+    UserFamily.weight,
+    UserFamily.allergy,
+    UserFamily.medication,
+    UserFamily.updated_at,
+)
+
+
+async def _live_beds(session: AsyncSession, rows: list) -> list:
+    """Snapshot rows with is_open/er_beds/operating_rooms from the ranking columns.
+
+    The snapshot file only changes on a rebuild; the ranking columns take bed
+    feed updates in place and are reloaded every HOSPITAL_RANKING_REFRESH_SEC.
+    If they cannot be loaded the snapshot's own bed fields are served as is.
+    """
+    if not rows:
+        return rows
+    if hospital_snapshot.db_degraded():
+        # whatever is loaded; don't reach for Postgres to build it
+        columns = hospital_ranking.index
+    else:
+        try:
+            columns = await hospital_ranking.get_index(session)
+        except CONNECTION_ERRORS:
+            columns = hospital_ranking.index
+    if columns is None:
+        return rows
+    live = {b["hospital_id"]: b for b in columns.bed_status([r.id for r in rows])}
+    return [
+        r._replace(is_open=b["is_open"], er_beds=b["er_beds"], operating_rooms=b["operating_rooms"])
+        if (b := live.get(r.id)) is not None
+        else r
+        for r in rows
+    ]
+
+
+def _degraded_search(q: str | None) -> list[int] | None:
+    """Ids matching ``q`` from the snapshot while Postgres is marked degraded, else None."""
+    if not q or not hospital_snapshot.db_degraded():
+        return None
+    snapshot = hospital_snapshot.current()
+    return snapshot.search(q) if snapshot is not None else None
 
 
 async def list_hospitals(
@@ -144,31 +392,279 @@ async def list_hospitals(
     q: str | None,
     page: int,
     size: int,
-) -> tuple[list[Hospital], int]:
-    query = select(Hospital)
-    count_query = select(func.count(Hospital.id))
+    with_total: bool = True,
+) -> tuple[list[Row], int | None]:
+    offset = (page - 1) * size
+    if (ids := _degraded_search(q)) is not None:
+        return await get_hospitals_by_ids(session, ids[offset : offset + size]), len(ids)
+    if q and HOSPITAL_SEARCH_BACKEND == "memory":
+        index = await hospital_search.get_index(session)
+        ids = index.search(q)
+        return await get_hospitals_by_ids(session, ids[offset : offset + size]), len(ids)
+    if q and HOSPITAL_SEARCH_BACKEND == "pg_trgm":
+        return await _search_hospitals_trgm(session, q, offset, size)
+    snapshot = hospital_snapshot.for_reads()
+    if snapshot is not None and not q:
+        items = await _live_beds(session, snapshot.page(offset, size))
+        return items, len(snapshot) if with_total else None
+
+    query = select(*HOSPITAL_COLUMNS)
     if q:
-        like = f"%{q}%"
-        query = query.where(Hospital.name.ilike(like))
-        count_query = count_query.where(Hospital.name.ilike(like))
+        query = query.where(_name_filter(q))
 
-    total = (await session.execute(count_query)).scalar_one()
+    total = await count_hospitals(session, q) if with_total else None
     result = await session.execute(
-        query.order_by(Hospital.id).offset((page - 1) * size).limit(size)
+        query.order_by(Hospital.id).offset(offset).limit(size)
     )
-    return list(result.scalars().all()), total
+    return list(result.all()), total
+
+
+def _trgm_match(q: str):
+    escaped = q.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return Hospital.name.ilike(f"%{escaped}%", escape="\\")
+
+
+def _name_filter(q: str):
+    if HOSPITAL_SEARCH_BACKEND == "pg_trgm":
+        return _trgm_match(q)
+    return Hospital.name.ilike(f"%{q}%")
+
+
+async def count_hospitals(session: AsyncSession, q: str | None) -> int:
+    # hospitals are read-only through the API, so exact totals are cached per
+    # query until the data is reloaded (see hospital_cache.invalidate_hospital_caches)
+    if (ids := _degraded_search(q)) is not None:
+        return len(ids)
+    if q and HOSPITAL_SEARCH_BACKEND == "memory":
+        index = await hospital_search.get_index(session)
+        return len(index.search(q))
+    snapshot = hospital_snapshot.for_reads()
+    if snapshot is not None and not q:
+        return len(snapshot)
+    key = (q or "").lower()
+    total = total_cache.get(key)
+    if total is None:
+        query = select(func.count(Hospital.id))
+        if q:
+            query = query.where(_name_filter(q))
+        total = (await session.execute(query)).scalar_one()
+        total_cache.set(key, total)
+    return total
+
+
+async def estimate_hospital_count(session: AsyncSession, q: str | None) -> int:
+    """Planner-statistics estimate of the number of matching hospitals."""
+    if q and (HOSPITAL_SEARCH_BACKEND == "memory" or hospital_snapshot.db_degraded()):
+        return await count_hospitals(session, q)
+    snapshot = hospital_snapshot.for_reads()
+    if not q and snapshot is not None:
+        return len(snapshot)
+    if not q:
+        reltuples = (
+            await session.execute(text("SELECT reltuples FROM pg_class WHERE oid = 'hospitals'::regclass"))
+        ).scalar_one()
+        # -1 (or 0 on old servers) means the table was never analyzed
+        if reltuples > 0:
+            return int(reltuples)
+        return await count_hospitals(session, q)
+    # q stays a bound parameter; only the compiled SQL text is prefixed
+    query = select(Hospital.id).where(_name_filter(q)).compile(dialect=session.bind.dialect)
+    conn = await session.connection()
+    plan = (
+        await conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {query}", query.params)
+    ).scalar_one()
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+async def _search_hospitals_trgm(
+    session: AsyncSession, q: str, offset: int, size: int
+) -> tuple[list[Row], int]:
+    # The GIN trigram index serves the ILIKE; the window count avoids a
+    # second scan for the total.
+    matches = _trgm_match(q)
+    result = await session.execute(
+        select(*HOSPITAL_COLUMNS, func.count().over().label("total"))
+        .where(matches)
+        .order_by(func.similarity(Hospital.name, q).desc(), Hospital.id)
+        .offset(offset)
+        .limit(size)
+    )
+    rows = result.all()
+    if rows:
+        total_cache.set(q.lower(), rows[0].total)
+        return rows, rows[0].total
+    return [], await count_hospitals(session, q)
 
 
-async def get_hospital_by_id(session: AsyncSession, hospital_id: int) -> Hospital | None:
-    result = await session.execute(select(Hospital).where(Hospital.id == hospital_id))
-    return result.scalar_one_or_none()
+async def list_hospitals_keyset(
+    session: AsyncSession,
+    q: str | None,
+    after: dict | None,
+    size: int,
+    with_total: bool,
+) -> tuple[list[Row], dict | None, int | None]:
+    """Cursor pagination. ``after`` is the position key returned for the previous
+    page; the returned key is None on the last page. The total is only counted
+    when asked for."""
+    ids = _degraded_search(q)
+    if ids is None and q and HOSPITAL_SEARCH_BACKEND == "memory":
+        ids = (await hospital_search.get_index(session)).search(q)
+    if ids is not None:
+        start = after.get("pos", 0) if after else 0
+        if after and not (0 < start <= len(ids) and ids[start - 1] == after["id"]):
+            # the ranking changed under the cursor (index rebuilt): resync on the id
+            start = ids.index(after["id"]) + 1 if after["id"] in ids else min(start, len(ids))
+        page_ids = ids[start : start + size]
+        end = start + len(page_ids)
+        next_key = {"pos": end, "id": page_ids[-1]} if end < len(ids) else None
+        items = await get_hospitals_by_ids(session, page_ids)
+        return items, next_key, len(ids) if with_total else None
+
+    if q and HOSPITAL_SEARCH_BACKEND == "pg_trgm":
+        matches = _trgm_match(q)
+        rank = func.similarity(Hospital.name, q)
+        query = select(*HOSPITAL_COLUMNS, rank.label("rank")).where(matches)
+        if after:
+            # similarity() is real; compare as real so the float round-trip is exact
+            last_rank = cast(after.get("rank", 1.0), REAL)
+            query = query.where(
+                or_(rank < last_rank, and_(rank == last_rank, Hospital.id > after["id"]))
+            )
+        rows = (await session.execute(query.order_by(rank.desc(), Hospital.id).limit(size + 1))).all()
+        items = rows[:size]
+        next_key = {"rank": rows[size - 1].rank, "id": items[-1].id} if len(rows) > size else None
+    elif not q and (snapshot := hospital_snapshot.for_reads()) is not None:
+        rows = snapshot.after(after["id"] if after else None, size + 1)
+        items = await _live_beds(session, rows[:size])
+        next_key = {"id": items[-1].id} if len(rows) > size else None
+    else:
+        query = select(*HOSPITAL_COLUMNS)
+        if q:
+            query = query.where(_name_filter(q))
+        if after:
+            query = query.where(Hospital.id > after["id"])
+        result = await session.execute(query.order_by(Hospital.id).limit(size + 1))
+        rows = list(result.all())
+        items = rows[:size]
+        next_key = {"id": items[-1].id} if len(rows) > size else None
+
+    total = await count_hospitals(session, q) if with_total else None
+    return items, next_key, total
+
+
+async def get_hospitals_by_ids(session: AsyncSession, hospital_ids: list[int]) -> list[Row]:
+    if not hospital_ids:
+        return []
+    snapshot = hospital_snapshot.for_reads()
+    if snapshot is not None:
+        return await _live_beds(session, snapshot.by_ids(hospital_ids))
+    result = await session.execute(
+        select(*HOSPITAL_COLUMNS).where(Hospital.id.in_(hospital_ids))
+    )
+    by_id = {h.id: h for h in result.all()}
+    # keep the caller's (ranked) order; ids deleted since the index was built drop out
+    return [by_id[i] for i in hospital_ids if i in by_id]
+
+
+async def nearest_hospitals(
+    session: AsyncSession,
+    lat: float,
+    lon: float,
+    k: int,
+    q: str | None = None,
+    open_only: bool = False,
+) -> list[tuple[Row, float]]:
+    """Return up to ``k`` (hospital, distance km) pairs nearest to (lat, lon)."""
+    if HOSPITAL_GEO_BACKEND == "earthdistance":
+        here = func.ll_to_earth(lat, lon)
+        point = func.ll_to_earth(Hospital.latitude, Hospital.longitude)
+        km = (func.earth_distance(point, here) / 1000).label("km")
+        query = select(*HOSPITAL_COLUMNS, km).where(
+            Hospital.latitude.is_not(None), Hospital.longitude.is_not(None)
+        )
+        if q:
+            query = query.where(_name_filter(q))
+        if open_only:
+            query = query.where(Hospital.is_open.is_(True))
+        # cube's <-> is served by the GiST index on ll_to_earth(latitude, longitude)
+        result = await session.execute(query.order_by(point.op("<->")(here)).limit(k))
+        return [(row, row.km) for row in result.all()]
+
+    index = await hospital_geo.get_index(session)
+    hospital_ids = None
+    if (ids := _degraded_search(q)) is not None:
+        hospital_ids = set(ids)
+    elif q and HOSPITAL_SEARCH_BACKEND == "memory":
+        hospital_ids = set((await hospital_search.get_index(session)).search(q))
+    elif q:
+        hospital_ids = set((await session.execute(select(Hospital.id).where(_name_filter(q)))).scalars())
+    # is_open in the index may lag the table, so over-fetch and re-check the rows
+    hits = index.nearest(lat, lon, k * 2 if open_only else k, open_only, hospital_ids)
+    distances = dict(hits)
+    hospitals = await get_hospitals_by_ids(session, list(distances))
+    return [(h, distances[h.id]) for h in hospitals if h.is_open or not open_only][:k]
+
+
+BED_COLUMNS = (Hospital.id, Hospital.is_open, Hospital.er_beds, Hospital.operating_rooms)
+
+
+async def apply_bed_updates(session: AsyncSession, updates) -> list[Row]:
+    """Apply bed status updates in one UPDATE ... FROM (VALUES ...).
+
+    None fields keep the current value, and repeated hospital ids are merged
+    in order. Returns the rows that actually changed; unknown ids and no-op
+    updates are skipped.
+    """
+    merged: dict[int, list] = {}
+    for u in updates:
+        current = merged.setdefault(u.hospital_id, [None, None, None])
+        for i, value in enumerate((u.is_open, u.er_beds, u.operating_rooms)):
+            if value is not None:
+                current[i] = value
+    if not merged:
+        return []
+    # sorted ids lock rows in the same order in concurrent feeds
+    changes = values(
+        column("id", Integer),
+        column("is_open", Boolean),
+        column("er_beds", Integer),
+        column("operating_rooms", Integer),
+        name="changes",
+    ).data([(i, *merged[i]) for i in sorted(merged)])
+    # an all-NULL VALUES column would otherwise be typed text
+    new = {
+        "is_open": func.coalesce(cast(changes.c.is_open, Boolean), Hospital.is_open),
+        "er_beds": func.coalesce(cast(changes.c.er_beds, Integer), Hospital.er_beds),
+        "operating_rooms": func.coalesce(
+            cast(changes.c.operating_rooms, Integer), Hospital.operating_rooms
+        ),
+    }
+    result = await session.execute(
+        update(Hospital)
+        .where(Hospital.id == changes.c.id)
+        .where(or_(*(v.is_distinct_from(getattr(Hospital, k)) for k, v in new.items())))
+        .values(**new)
+        .returning(*BED_COLUMNS)
+    )
+    rows = result.all()
+    await session.commit()
+    return rows
 
 
-async def list_family_members(session: AsyncSession, user_id: int) -> list[UserFamily]:
+async def get_hospital_by_id(session: AsyncSession, hospital_id: int) -> Row | None:
+    snapshot = hospital_snapshot.for_reads()
+    if snapshot is not None:
+        hospital = snapshot.get(hospital_id)
+        return (await _live_beds(session, [hospital]))[0] if hospital else None
+    result = await session.execute(select(*HOSPITAL_COLUMNS).where(Hospital.id == hospital_id))
+    return result.one_or_none()
+
+
+async def list_family_members(session: AsyncSession, user_id: int) -> list[Row]:
     result = await session.execute(
-        select(UserFamily).where(UserFamily.user_id == user_id).order_by(UserFamily.id)
+        select(*FAMILY_COLUMNS).where(UserFamily.user_id == user_id).order_by(UserFamily.id)
     )
-    return list(result.scalars().all())
+    return list(result.all())
 
 
 async def get_family_member(session: AsyncSession, family_id: int) -> UserFamily | None:
@@ -188,26 +684,28 @@ async def create_family_member(
     allergy: dict | None,
     medication: dict | None,
 ) -> UserFamily:
-    member = UserFamily(
-        user_id=user_id,
-        relationship=relationship,
-        name=name,
-        birth_date=birth_date,
-        gender=gender,
-        height=height,
-        weight=weight,
-        allergy=allergy,
-        medication=medication,
+    return await _write_returning(
+        session,
+        insert(UserFamily)
+        .values(
+            user_id=user_id,
+            relationship=relationship,
+            name=name,
+            birth_date=birth_date,
+            gender=gender,
+            height=height,
+            weight=weight,
+            allergy=allergy,
+            medication=medication,
+        )
+        .returning(UserFamily),
     )
-    session.add(member)
-    await session.commit()
-    await session.refresh(member)
-    return member
 
 
 async def patch_family_member(
     session: AsyncSession,
-    member: UserFamily,
+    user_id: int,
+    family_id: int,
     relationship: str | None,
     name: str | None,
     birth_date: str | None,
@@ -216,29 +714,77 @@ async def patch_family_member(
     weight: float | None,
     allergy: dict | None,
     medication: dict | None,
-) -> UserFamily:
-    if relationship is not None:
-        member.relationship = relationship
-    if name is not None:
-        member.name = name
-    if birth_date is not None:
-        member.birth_date = birth_date
-    if gender is not None:
-        member.gender = gender
-    if height is not None:
-        member.height = height
-    if weight is not None:
-        member.weight = weight
-    if allergy is not None:
-        member.allergy = allergy
-    if medication is not None:
-        member.medication = medication
-    session.add(member)
+) -> UserFamily | None:
+    values = _changes(
+        relationship=relationship,
+        name=name,
+        birth_date=birth_date,
+        gender=gender,
+        height=height,
+        weight=weight,
+        allergy=allergy,
+        medication=medication,
+    )
+    # scoping by user_id makes "not found" and "not yours" the same single query
+    return await _write_returning(
+        session,
+        update(UserFamily)
+        .where(UserFamily.id == family_id, UserFamily.user_id == user_id)
+        .values(**values)
+        .returning(UserFamily),
+    )
+
+
+async def delete_family_member(session: AsyncSession, user_id: int, family_id: int) -> bool:
+    result = await session.execute(
+        delete(UserFamily)
+        .where(UserFamily.id == family_id, UserFamily.user_id == user_id)
+        .returning(UserFamily.id)
+    )
+    deleted = result.scalar_one_or_none() is not None
     await session.commit()
-    await session.refresh(member)
-    return member
+    return deleted
 
 
-async def delete_family_member(session: AsyncSession, member: UserFamily) -> None:
-    await session.delete(member)
+async def apply_family_batch(
+    session: AsyncSession,
+    user_id: int,
+    creates: list[dict],
+    patches: list[tuple[int, dict]],
+    deletes: list[int],
+) -> tuple[list[UserFamily], list[UserFamily | None], set[int]]:
+    """Apply creates, then patches, then deletes for one user in a single transaction.
+
+    Returns the created members (in ``creates`` order), the patched members
+    (None where the id was not found) and the ids actually deleted.
+    """
+    created: list[UserFamily] = []
+    if creates:
+        # one multi-row INSERT ... RETURNING for all new members; render_nulls
+        # keeps rows with different None fields in the same statement
+        result = await session.execute(
+            insert(UserFamily).returning(UserFamily, sort_by_parameter_order=True),
+            [{"user_id": user_id, **values} for values in creates],
+            execution_options={"render_nulls": True},
+        )
+        created = list(result.scalars().all())
+    patched: list[UserFamily | None] = []
+    for family_id, values in patches:
+        result = await session.execute(
+            update(UserFamily)
+            .where(UserFamily.id == family_id, UserFamily.user_id == user_id)
+            .values(**values)
+            .returning(UserFamily)
+            .execution_options(populate_existing=True)
+        )
+        patched.append(result.scalar_one_or_none())
+    deleted: set[int] = set()
+    if deletes:
+        result = await session.execute(
+            delete(UserFamily)
+            .where(UserFamily.id.in_(deletes), UserFamily.user_id == user_id)
+            .returning(UserFamily.id)
+        )
+        deleted = set(result.scalars().all())
     await session.commit()
+    return created, patched, deleted
@@ -1,5 +1,6 @@
 import os
 
+from sqlalchemy.exc import InterfaceError, OperationalError
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import declarative_base
 
@@ -13,6 +14,10 @@ async_session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit
 
 Base = declarative_base()
 
+# Postgres is unreachable (refused, dropped, timed out), as opposed to a bad
+# statement or constraint violation, which these deliberately leave out.
+CONNECTION_ERRORS = (OperationalError, InterfaceError, OSError, TimeoutError)
+
 
 """
 Schema is managed manually via db_init.sql.
@@ -8,6 +8,7 @@ CREATE TABLE IF NOT EXISTS users (
     id SERIAL PRIMARY KEY,
     email VARCHAR(255) UNIQUE NOT NULL,
     password_hash VARCHAR(255) NOT NULL,
+    session_gen INTEGER NOT NULL DEFAULT 0,
     created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
     updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
 );
@@ -29,7 +30,8 @@ CREATE TABLE IF NOT EXISTS user_profiles (
 CREATE TABLE IF NOT EXISTS refresh_tokens (
     id SERIAL PRIMARY KEY,
     user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
-    token VARCHAR(255) UNIQUE NOT NULL,
+    token_hash BYTEA NOT NULL,
+    session_gen INTEGER NOT NULL DEFAULT 0,
     revoked BOOLEAN NOT NULL DEFAULT FALSE,
     created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
     expires_at TIMESTAMPTZ NOT NULL
@@ -41,6 +43,8 @@ CREATE TABLE IF NOT EXISTS hospitals (
     is_open BOOLEAN NOT NULL DEFAULT TRUE,
     distance_km DOUBLE PRECISION,
     address VARCHAR(255),
+    latitude DOUBLE PRECISION,
+    longitude DOUBLE PRECISION,
     er_beds INTEGER,
     operating_rooms INTEGER,
     created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
@@ -63,4 +67,8 @@ CREATE TABLE IF NOT EXISTS user_families (
 
 CREATE INDEX IF NOT EXISTS idx_users_email ON users(email);
 CREATE INDEX IF NOT EXISTS idx_hospitals_name ON hospitals(name);
-CREATE INDEX IF NOT EXISTS idx_user_families_user_id ON user_families(user_id);
\ No newline at end of file
+CREATE INDEX IF NOT EXISTS idx_user_families_user_id ON user_families(user_id);
+CREATE INDEX IF NOT EXISTS idx_refresh_tokens_token_hash ON refresh_tokens USING hash (token_hash);
+CREATE INDEX IF NOT EXISTS idx_refresh_tokens_user_id ON refresh_tokens(user_id);
+CREATE INDEX IF NOT EXISTS idx_refresh_tokens_expires_at ON refresh_tokens(expires_at);
+CREATE INDEX IF NOT EXISTS idx_refresh_tokens_revoked_created_at ON refresh_tokens(created_at) WHERE revoked;
\ No newline at end of file
@@ -0,0 +1,278 @@
+"""
+Auto-call dispatch.
+
+Triggered jobs go through a bounded asyncio queue to a small pool of worker
+tasks. A worker calls the job's hospitals in parallel (at most
+AUTOCALL_MAX_PARALLEL at a time, in call-list order), gives each call
+AUTOCALL_CALL_TIMEOUT_SEC, and cancels the remaining calls as soon as one
+hospital accepts. Calls go through a pluggable CallProvider, set with
+AUTOCALL_PROVIDER; without one, triggers are refused rather than faked.
+
+Jobs live in this process only: status lookups and event streams must reach
+the worker that accepted the trigger (sticky routing when running several),
+and a restart forgets every job. Queued and running jobs are kept until they
+finish; finished jobs are kept for AUTOCALL_JOB_TTL_SEC.
+"""
+import asyncio
+import importlib
+import os
+import random
+import uuid
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+
+from login.cache import TTLCache
+from login.pubsub import Broker, broker
+
+AUTOCALL_PROVIDER = os.getenv("AUTOCALL_PROVIDER", "")
+AUTOCALL_WORKERS = int(os.getenv("AUTOCALL_WORKERS", "4"))
+AUTOCALL_QUEUE_MAX = int(os.getenv("AUTOCALL_QUEUE_MAX", "100"))
+AUTOCALL_MAX_PARALLEL = int(os.getenv("AUTOCALL_MAX_PARALLEL", "5"))
+AUTOCALL_CALL_TIMEOUT_SEC = float(os.getenv("AUTOCALL_CALL_TIMEOUT_SEC", "30"))
+AUTOCALL_JOB_TTL_SEC = float(os.getenv("AUTOCALL_JOB_TTL_SEC", "3600"))
+
+
+class DispatchQueueFull(Exception):
+    pass
+
+
+class DispatchNotConfigured(Exception):
+    pass
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+@dataclass
+class CallAttempt:
+    hospital_id: int
+    # pending -> dialing -> accepted | rejected | timed_out | failed, or cancelled
+    status: str = "pending"
+    started_at: str | None = None
+    finished_at: str | None = None
+
+
+@dataclass
+class AutoCallJob:
+    user_id: int
+    hospital_ids: list[int]
+    id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    # queued -> dialing -> accepted | exhausted | failed
+    status: str = "queued"
+    accepted_hospital_id: int | None = None
+    attempts: dict[int, CallAttempt] = field(default_factory=dict)
+    created_at: str = field(default_factory=_now)
+    finished_at: str | None = None
+    # bumped on every published transition; events carry it as "seq"
+    seq: int = 0
+
+    def __post_init__(self) -> None:
+        self.attempts = {i: CallAttempt(i) for i in self.hospital_ids}
+
+    @property
+    def done(self) -> bool:
+        return self.status in {"accepted", "exhausted", "failed"}
+
+
+class CallProvider(ABC):
+    """Places one call. Returns True when the hospital accepts the patient."""
+
+    @abstractmethod
+    async def call(self, hospital_id: int, job: AutoCallJob) -> bool:
+        ...
+
+
+class FakeCallProvider(CallProvider):
+    """Local stand-in for a telephony provider, for tests and development only
+    (AUTOCALL_PROVIDER=fake); it places no calls.
+
+    Hospitals in ``accept_ids`` accept; when ``accept_ids`` is None each call
+    accepts with probability ``accept_rate``. Every call takes ``delay`` seconds.
+    """
+
+    def __init__(
+        self, delay: float = 0.5, accept_rate: float = 0.3, accept_ids: set[int] | None = None
+    ) -> None:
+        self.delay = delay
+        self.accept_rate = accept_rate
+        self.accept_ids = accept_ids
+        self.calls: list[int] = []
+
+    async def call(self, hospital_id: int, job: AutoCallJob) -> bool:
+        self.calls.append(hospital_id)
+        await asyncio.sleep(self.delay)
+        if self.accept_ids is not None:
+            return hospital_id in self.accept_ids
+        return random.random() < self.accept_rate
+
+
+def load_provider(spec: str) -> CallProvider | None:
+    # "", "fake" or "package.module:ClassName" (constructed without arguments)
+    if not spec:
+        return None
+    if spec == "fake":
+        return FakeCallProvider(
+            delay=float(os.getenv("FAKE_CALL_DELAY_SEC", "0.5")),
+            accept_rate=float(os.getenv("FAKE_CALL_ACCEPT_RATE", "0.3")),
+        )
+    module_name, _, class_name = spec.partition(":")
+    return getattr(importlib.import_module(module_name), class_name)()
+
+
+class AutoCallDispatcher:
+    def __init__(
+        self,
+        provider: CallProvider | None,
+        workers: int,
+        queue_size: int,
+        max_parallel: int,
+        call_timeout: float,
+        job_ttl: float,
+        events: Broker,
+    ) -> None:
+        if queue_size <= 0:
+            # asyncio.Queue treats 0 as unbounded
+            raise ValueError("AUTOCALL_QUEUE_MAX must be positive")
+        self.provider = provider
+        self.events = events
+        self.workers = max(1, workers)
+        self.queue_size = queue_size
+        self.max_parallel = max(1, max_parallel)
+        self.call_timeout = call_timeout
+        # unfinished jobs are pinned here (at most queue_size + workers of
+        # them) and move to the bounded ``finished`` cache once done
+        self.active: dict[str, AutoCallJob] = {}
+        self.finished = TTLCache(maxsize=10_000, ttl=job_ttl)
+        self._queue: asyncio.Queue[AutoCallJob] | None = None
+        self._tasks: list[asyncio.Task] = []
+
+    async def start(self) -> None:
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def submit(self, user_id: int, hospital_ids: list[int]) -> AutoCallJob:
+        if self.provider is None:
+            raise DispatchNotConfigured()
+        if self._queue is None:
+            raise RuntimeError("dispatcher is not started")
+        job = AutoCallJob(user_id=user_id, hospital_ids=hospital_ids)
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            raise DispatchQueueFull()
+        self.active[job.id] = job
+        return job
+
+    def get(self, job_id: str) -> AutoCallJob | None:
+        return self.active.get(job_id) or self.finished.get(job_id)
+
+    @staticmethod
+    def topic(job_id: str) -> str:
+        return f"autocall:{job_id}"
+
+    def _set_job_status(self, job: AutoCallJob, status: str) -> None:
+        job.status = status
+        if job.done:
+            job.finished_at = _now()
+            self.active.pop(job.id, None)
+            self.finished.set(job.id, job)
+        job.seq += 1
+        self.events.publish(
+            self.topic(job.id),
+            {
+                "type": "job",
+                "seq": job.seq,
+                "status": status,
+                "accepted_hospital_id": job.accepted_hospital_id,
+                "at": job.finished_at or _now(),
+            },
+        )
+
+    def _set_attempt_status(self, job: AutoCallJob, attempt: CallAttempt, status: str) -> None:
+        attempt.status = status
+        if status == "dialing":
+            attempt.started_at = _now()
+        elif status != "pending":
+            attempt.finished_at = _now()
+        job.seq += 1
+        self.events.publish(
+            self.topic(job.id),
+            {
+                "type": "attempt",
+                "seq": job.seq,
+                "hospital_id": attempt.hospital_id,
+                "status": status,
+                "at": attempt.finished_at if status != "dialing" else attempt.started_at,
+            },
+        )
+
+    async def _worker(self) -> None:
+        while True:
+            job = await self._queue.get()
+            try:
+                await self.run(job)
+            except Exception:
+                self._set_job_status(job, "failed")
+            finally:
+                self._queue.task_done()
+
+    async def run(self, job: AutoCallJob) -> None:
+        self._set_job_status(job, "dialing")
+        limit = asyncio.Semaphore(self.max_parallel)
+        # tasks are created in call-list order and the semaphore wakes waiters
+        # FIFO, so the best-ranked hospitals are dialed first
+        tasks = [asyncio.create_task(self._attempt(job, i, limit)) for i in job.hospital_ids]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                hospital_id = await next_done
+                if hospital_id is not None:
+                    job.accepted_hospital_id = hospital_id
+                    break
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        self._set_job_status(
+            job, "accepted" if job.accepted_hospital_id is not None else "exhausted"
+        )
+
+    async def _attempt(self, job: AutoCallJob, hospital_id: int, limit: asyncio.Semaphore) -> int | None:
+        attempt = job.attempts[hospital_id]
+        try:
+            async with limit:
+                self._set_attempt_status(job, attempt, "dialing")
+                accepted = await asyncio.wait_for(
+                    self.provider.call(hospital_id, job), self.call_timeout
+                )
+        except asyncio.TimeoutError:
+            self._set_attempt_status(job, attempt, "timed_out")
+            return None
+        except asyncio.CancelledError:
+            self._set_attempt_status(job, attempt, "cancelled")
+            raise
+        except Exception:
+            self._set_attempt_status(job, attempt, "failed")
+            return None
+        self._set_attempt_status(job, attempt, "accepted" if accepted else "rejected")
+        return hospital_id if accepted else None
+
+
+dispatcher = AutoCallDispatcher(
+    provider=load_provider(AUTOCALL_PROVIDER),
+    workers=AUTOCALL_WORKERS,
+    queue_size=AUTOCALL_QUEUE_MAX,
+    max_parallel=AUTOCALL_MAX_PARALLEL,
+    call_timeout=AUTOCALL_CALL_TIMEOUT_SEC,
+    job_ttl=AUTOCALL_JOB_TTL_SEC,
+    events=broker,
+)
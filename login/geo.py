@@ -0,0 +1,180 @@
+"""
+Nearest-hospital lookup.
+
+Backends (HOSPITAL_GEO_BACKEND):
+- "memory": in-process k-d tree built from the hospitals table
+- "earthdistance": Postgres cube/earthdistance KNN over a GiST index
+  (requires login/migrations/003_hospitals_earthdistance.sql)
+"""
+import heapq
+import math
+import os
+from typing import Callable
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from login import db
+from login.cache import RefreshingIndex
+from login.models import Hospital
+
+HOSPITAL_GEO_BACKEND = os.getenv("HOSPITAL_GEO_BACKEND", "memory")
+HOSPITAL_GEO_REFRESH_SEC = float(os.getenv("HOSPITAL_GEO_REFRESH_SEC", "300"))
+EARTH_RADIUS_KM = 6371.0088
+# Filtered lookups with at most this fraction of the points as candidates are
+# answered by scanning the candidates: a k-d walk that rejects most of the
+# points it reaches degrades to visiting the whole tree.
+GEO_SCAN_FRACTION = 0.25
+
+
+def to_unit_vector(lat: float, lon: float) -> tuple[float, float, float]:
+    # On the unit sphere the straight-line (chord) distance grows monotonically
+    # with the great-circle distance, so a plain Euclidean k-d tree over these
+    # points returns true nearest neighbours without any lat/lon wraparound cases.
+    phi = math.radians(lat)
+    lam = math.radians(lon)
+    cos_phi = math.cos(phi)
+    return cos_phi * math.cos(lam), cos_phi * math.sin(lam), math.sin(phi)
+
+
+def chord_to_km(chord: float) -> float:
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, chord / 2))
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp, dl = p2 - p1, math.radians(lon2 - lon1)
+    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+class KDTree:
+    """Static, balanced 3-d tree stored implicitly in arrays.
+
+    The subtree for ``[lo, hi)`` has its splitting point at ``(lo + hi) // 2``
+    and splits on axis ``depth % 3``.
+    """
+
+    def __init__(self, ids: list[int], points: list[tuple[float, float, float]]) -> None:
+        order = list(range(len(ids)))
+        self._arrange(order, points, 0, len(order), 0)
+        self.ids = [ids[i] for i in order]
+        self.points = [points[i] for i in order]
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @classmethod
+    def _arrange(cls, order, points, lo, hi, depth) -> None:
+        if hi - lo <= 1:
+            return
+        axis = depth % 3
+        order[lo:hi] = sorted(order[lo:hi], key=lambda i: points[i][axis])
+        mid = (lo + hi) // 2
+        cls._arrange(order, points, lo, mid, depth + 1)
+        cls._arrange(order, points, mid + 1, hi, depth + 1)
+
+    def nearest(
+        self,
+        target: tuple[float, float, float],
+        k: int,
+        accept: Callable[[int], bool] | None = None,
+    ) -> list[tuple[float, int]]:
+        """Return up to ``k`` (chord distance, id) pairs, closest first."""
+        heap: list[tuple[float, int]] = []  # max-heap on squared distance
+        ids, points = self.ids, self.points
+        tx, ty, tz = target
+
+        def visit(lo: int, hi: int, depth: int) -> None:
+            if lo >= hi:
+                return
+            mid = (lo + hi) // 2
+            px, py, pz = points[mid]
+            d2 = (px - tx) ** 2 + (py - ty) ** 2 + (pz - tz) ** 2
+            if accept is None or accept(ids[mid]):
+                if len(heap) < k:
+                    heapq.heappush(heap, (-d2, ids[mid]))
+                elif d2 < -heap[0][0]:
+                    heapq.heapreplace(heap, (-d2, ids[mid]))
+            diff = target[depth % 3] - points[mid][depth % 3]
+            near, far = ((lo, mid), (mid + 1, hi)) if diff < 0 else ((mid + 1, hi), (lo, mid))
+            visit(near[0], near[1], depth + 1)
+            if len(heap) < k or diff * diff < -heap[0][0]:
+                visit(far[0], far[1], depth + 1)
+
+        if k > 0:
+            visit(0, len(ids), 0)
+        return sorted((math.sqrt(-d2), i) for d2, i in heap)
+
+
+class HospitalGeoIndex:
+    def __init__(self, rows: list[tuple[int, float, float, bool]]) -> None:
+        self.points = {row[0]: to_unit_vector(row[1], row[2]) for row in rows}
+        self.open_ids = {hospital_id for hospital_id, _lat, _lon, is_open in rows if is_open}
+        self.tree = KDTree(list(self.points), list(self.points.values()))
+
+    def __len__(self) -> int:
+        return len(self.tree)
+
+    def set_open(self, hospital_id: int, is_open: bool) -> None:
+        if hospital_id not in self.points:
+            return
+        if is_open:
+            self.open_ids.add(hospital_id)
+        else:
+            self.open_ids.discard(hospital_id)
+
+    def nearest(
+        self,
+        lat: float,
+        lon: float,
+        k: int,
+        open_only: bool = False,
+        hospital_ids: set[int] | None = None,
+    ) -> list[tuple[int, float]]:
+        """Return up to ``k`` (hospital id, distance km) pairs, closest first."""
+        target = to_unit_vector(lat, lon)
+        if hospital_ids is not None:
+            candidates = hospital_ids & (self.open_ids if open_only else self.points.keys())
+        elif open_only:
+            candidates = self.open_ids
+        else:
+            candidates = None
+
+        if candidates is None:
+            hits = self.tree.nearest(target, k)
+        elif len(candidates) <= len(self.tree) * GEO_SCAN_FRACTION:
+            points = self.points
+            hits = heapq.nsmallest(k, ((math.dist(target, points[i]), i) for i in candidates))
+        else:
+            hits = self.tree.nearest(target, k, candidates.__contains__)
+        return [(hospital_id, chord_to_km(chord)) for chord, hospital_id in hits]
+
+
+class HospitalGeo(RefreshingIndex):
+    async def load(self, session: AsyncSession) -> list[tuple[int, float, float, bool]]:
+        result = await session.execute(
+            select(Hospital.id, Hospital.latitude, Hospital.longitude, Hospital.is_open).where(
+                Hospital.latitude.is_not(None), Hospital.longitude.is_not(None)
+            )
+        )
+        return [tuple(row) for row in result.all()]
+
+    def build(self, rows: list[tuple[int, float, float, bool]]) -> HospitalGeoIndex:
+        return HospitalGeoIndex(rows)
+
+    def patch(self, index: HospitalGeoIndex, changes) -> None:
+        # only is_open is indexed; hospitals without coordinates are not in the tree
+        for c in changes:
+            index.set_open(c.id, c.is_open)
+
+    def stats(self) -> dict:
+        return {
+            "backend": HOSPITAL_GEO_BACKEND,
+            "points": len(self.index) if self.index else 0,
+            "rebuilds": self.rebuilds,
+            "patches": self.patches,
+        }
+
+
+hospital_geo = HospitalGeo(refresh_sec=HOSPITAL_GEO_REFRESH_SEC, session_factory=db.async_session)
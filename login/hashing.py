@@ -0,0 +1,122 @@
+import asyncio
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable
+
+
+class HashQueueFull(Exception):
+    pass
+
+
+def _run_timed(fn: Callable[..., Any], *args: Any) -> tuple[float, Any]:
+    # time.monotonic is system-wide on Linux, so the start time is comparable
+    # with the submit time even when this runs in a worker process.
+    started_at = time.monotonic()
+    return started_at, fn(*args)
+
+
+class HashingService:
+    """Runs password hashing/verification in a bounded worker pool.
+
+    Argon2 is CPU bound and takes tens of milliseconds, so calling it inline
+    from an ``async def`` handler stalls every other request on the worker.
+    Jobs beyond ``workers + max_queue`` are rejected with ``HashQueueFull``
+    instead of piling up behind a login storm.
+    """
+
+    def __init__(
+        self,
+        hash_fn: Callable[[str], str],
+        verify_fn: Callable[[str, str], bool],
+        workers: int,
+        max_queue: int,
+        executor: str = "thread",
+    ) -> None:
+        if executor not in {"thread", "process"}:
+            raise ValueError(f"unknown executor kind: {executor}")
+        self.hash_fn = hash_fn
+        self.verify_fn = verify_fn
+        self.workers = max(1, workers)
+        self.max_queue = max(0, max_queue)
+        self.executor_kind = executor
+        self._executor: Executor | None = None
+
+        self.in_flight = 0
+        self.max_queue_depth = 0
+        self.completed = 0
+        self.rejected = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    @property
+    def queue_depth(self) -> int:
+        return max(0, self.in_flight - self.workers)
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.executor_kind == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers, thread_name_prefix="hashing"
+                )
+        return self._executor
+
+    async def _submit(self, fn: Callable[..., Any], *args: Any) -> Any:
+        if self.in_flight >= self.workers + self.max_queue:
+            self.rejected += 1
+            raise HashQueueFull()
+
+        loop = asyncio.get_running_loop()
+        future = self._get_executor().submit(_run_timed, fn, *args)
+        self.in_flight += 1
+        self.max_queue_depth = max(self.max_queue_depth, self.queue_depth)
+        # The slot is released when the job itself finishes, not when the
+        # awaiting request does: a cancelled request (client disconnect) leaves
+        # its argon2 job running in the pool, and it must keep counting.
+        future.add_done_callback(partial(self._job_done, loop, time.monotonic()))
+        _started_at, result = await asyncio.wrap_future(future)
+        return result
+
+    def _job_done(self, loop: asyncio.AbstractEventLoop, submitted_at: float, future) -> None:
+        # runs in the worker thread (or the process pool's management thread)
+        try:
+            loop.call_soon_threadsafe(self._release, submitted_at, future)
+        except RuntimeError:
+            pass  # the loop is already closed (shutdown)
+
+    def _release(self, submitted_at: float, future) -> None:
+        self.in_flight -= 1
+        if future.cancelled() or future.exception() is not None:
+            return
+        started_at, _result = future.result()
+        wait = max(0.0, started_at - submitted_at)
+        self.completed += 1
+        self.wait_total += wait
+        self.wait_max = max(self.wait_max, wait)
+
+    async def hash(self, password: str) -> str:
+        return await self._submit(self.hash_fn, password)
+
+    async def verify(self, password: str, hashed: str) -> bool:
+        return await self._submit(self.verify_fn, password, hashed)
+
+    def stats(self) -> dict:
+        return {
+            "executor": self.executor_kind,
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "in_flight": self.in_flight,
+            "queue_depth": self.queue_depth,
+            "max_queue_depth": self.max_queue_depth,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "wait_ms_avg": (self.wait_total / self.completed * 1000) if self.completed else 0.0,
+            "wait_ms_max": self.wait_max * 1000,
+        }
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
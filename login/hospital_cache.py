@@ -0,0 +1,64 @@
+"""
+In-process caches derived from the hospitals table.
+
+Hospitals are read-only through the API, so these only go stale when the data
+is reloaded out of band; call invalidate_hospital_caches() after a reload.
+login.ingest also sends a NOTIFY on HOSPITAL_RELOAD_CHANNEL, which
+HospitalReloadListener turns into an invalidation in every API process.
+The TTLs bound staleness for reloads this process is not told about.
+"""
+import os
+
+from login.cache import TTLCache
+from login.geo import hospital_geo
+from login.notify import NotifyListener
+from login.ranking import hospital_ranking
+from login.search import hospital_search
+from login.snapshot import hospital_snapshot
+
+HOSPITAL_RELOAD_CHANNEL = "hospitals_reloaded"
+HOSPITAL_RELOAD_LISTEN = os.getenv("HOSPITAL_RELOAD_LISTEN", "1") == "1"
+
+# normalized query ("" for the unfiltered list) -> exact total
+total_cache = TTLCache(
+    maxsize=int(os.getenv("HOSPITAL_TOTAL_CACHE_SIZE", "1024")),
+    ttl=float(os.getenv("HOSPITAL_TOTAL_CACHE_TTL", "300")),
+)
+
+
+def invalidate_hospital_caches() -> None:
+    total_cache.clear()
+    hospital_search.invalidate()
+    hospital_geo.invalidate()
+    hospital_ranking.invalidate()
+    hospital_snapshot.invalidate()
+
+
+class HospitalReloadListener(NotifyListener):
+    """Invalidates the caches on every reload NOTIFY.
+
+    Also after a reconnect, since a reload may have been missed meanwhile.
+    """
+
+    channel = HOSPITAL_RELOAD_CHANNEL
+    name = "hospital reload"
+
+    def on_notify(self, payload: str) -> None:
+        invalidate_hospital_caches()
+
+    def on_reconnect(self) -> None:
+        invalidate_hospital_caches()
+
+
+reload_listener = HospitalReloadListener(enabled=HOSPITAL_RELOAD_LISTEN)
+
+
+def stats() -> dict:
+    return {
+        "totals": total_cache.stats(),
+        "search": hospital_search.stats(),
+        "geo": hospital_geo.stats(),
+        "ranking": hospital_ranking.stats(),
+        "reload_listener": reload_listener.stats(),
+        "snapshot": hospital_snapshot.stats(),
+    }
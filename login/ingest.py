@@ -0,0 +1,304 @@
+"""
+Bulk hospital data load.
+
+Streams a CSV or JSON file into a temporary staging table with Postgres COPY
+and merges it into ``hospitals`` with set-based UPDATE ... FROM / INSERT ...
+SELECT statements, all in a single transaction, so readers see either the old
+data or the new data. Rows whose values did not change are left alone (no
+dead tuples), and ``--prune`` also deletes hospitals missing from the file,
+which makes the load a full refresh.
+
+The file carries the hospital ``id`` and any of the columns in
+INGEST_COLUMNS; CSV needs a header row, JSON is either an array of objects or
+one object per line (both are read incrementally). After the merge the table
+is analyzed and a ``hospitals_reloaded`` notification is sent so running API
+processes drop their hospital caches and rebuild their in-memory indexes (see
+hospital_cache.HospitalReloadListener). When HOSPITAL_SNAPSHOT_PATH is set the
+mmap snapshot (login/snapshot.py) is rebuilt first and the notification goes
+out once the new file is in place, so workers never rebuild their indexes
+against the old snapshot.
+
+    python -m login.ingest hospitals.csv [--prune]
+"""
+import argparse
+import asyncio
+import csv
+import itertools
+import json
+import os
+import time
+from pathlib import Path
+
+from dotenv import load_dotenv
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+if __name__ == "__main__":
+    # as a script, load .env before db/config read it (app.py does the same)
+    load_dotenv(override=True)
+
+from login import db
+from login.hospital_cache import HOSPITAL_RELOAD_CHANNEL, invalidate_hospital_caches
+from login.snapshot import HOSPITAL_SNAPSHOT_PATH, build_snapshot
+
+INGEST_COPY_CHUNK_BYTES = int(os.getenv("INGEST_COPY_CHUNK_BYTES", str(1 << 20)))
+
+# column -> staging type; "id" is the merge key and must be present
+INGEST_COLUMNS = {
+    "id": "integer",
+    "name": "varchar(200)",
+    "is_open": "boolean",
+    "distance_km": "double precision",
+    "address": "varchar(255)",
+    "latitude": "double precision",
+    "longitude": "double precision",
+    "er_beds": "integer",
+    "operating_rooms": "integer",
+}
+
+STAGING_TABLE = "hospitals_staging"
+
+
+class IngestError(Exception):
+    pass
+
+
+def _check_columns(columns: list[str]) -> list[str]:
+    columns = [c.strip() for c in columns]
+    unknown = [c for c in columns if c not in INGEST_COLUMNS]
+    if unknown:
+        raise IngestError(f"unknown columns: {', '.join(unknown)}")
+    if "id" not in columns:
+        raise IngestError("the file has no id column")
+    if len(set(columns)) != len(columns):
+        raise IngestError("duplicate columns")
+    return columns
+
+
+def _detect_format(path: Path) -> str:
+    suffix = path.suffix.lower()
+    if suffix == ".csv":
+        return "csv"
+    if suffix in {".json", ".jsonl", ".ndjson"}:
+        return "json"
+    raise IngestError(f"cannot tell the format of {path.name}; use --format")
+
+
+def _json_array(f):
+    # one element at a time, so a large array is never held in memory
+    decoder = json.JSONDecoder()
+    buf = f.read(INGEST_COPY_CHUNK_BYTES).lstrip()
+    if not buf.startswith("["):
+        raise IngestError("expected a JSON array")
+    pos = 1
+    while True:
+        while pos < len(buf) and (buf[pos].isspace() or buf[pos] == ","):
+            pos += 1
+        if pos < len(buf):
+            if buf[pos] == "]":
+                return
+            try:
+                record, pos = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                pass  # the element straddles the chunk boundary: read more
+            else:
+                if not isinstance(record, dict):
+                    raise IngestError("JSON array elements must be objects")
+                yield record
+                continue
+        more = f.read(INGEST_COPY_CHUNK_BYTES)
+        if not more:
+            raise IngestError("truncated or invalid JSON array")
+        buf, pos = buf[pos:] + more, 0
+
+
+def _json_records(path: Path):
+    with path.open("r", encoding="utf-8-sig") as f:
+        head = f.read(4096).lstrip()[:1]
+        f.seek(0)
+        if head == "[":
+            yield from _json_array(f)
+            return
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+async def _copy_csv(cursor, path: Path) -> tuple[list[str], int]:
+    # the file goes to the server as-is; only the header line is parsed here
+    with path.open("r", encoding="utf-8-sig", newline="") as f:
+        columns = _check_columns(next(csv.reader([f.readline()])))
+        copy_sql = (
+            f"COPY {STAGING_TABLE} ({', '.join(columns)}) "
+            "FROM STDIN WITH (FORMAT csv)"
+        )
+        async with cursor.copy(copy_sql) as copy:
+            while chunk := f.read(INGEST_COPY_CHUNK_BYTES):
+                await copy.write(chunk.encode("utf-8"))
+    await cursor.execute(f"SELECT count(*) FROM {STAGING_TABLE}")
+    return columns, (await cursor.fetchone())[0]
+
+
+async def _copy_json(cursor, path: Path) -> tuple[list[str], int]:
+    records = _json_records(path)
+    first = next(records, None)
+    if first is None:
+        return _check_columns(["id"]), 0
+    # the first object decides the columns; keys missing later load as NULL
+    columns = _check_columns(list(first))
+    copy_sql = f"COPY {STAGING_TABLE} ({', '.join(columns)}) FROM STDIN"
+    rows = 0
+    async with cursor.copy(copy_sql) as copy:
+        for record in itertools.chain([first], records):
+            await copy.write_row([record.get(c) for c in columns])
+            rows += 1
+    return columns, rows
+
+
+def _merge_sql(columns: list[str], prune: bool) -> list[tuple[str, str]]:
+    # staging is deduplicated first, so each statement sees one row per id.
+    # Existing rows are updated and new ones inserted separately rather than
+    # with ON CONFLICT, which checks NOT NULL on the insert side even for rows
+    # that end up as updates (a file with only id,er_beds would fail on name).
+    cols = ", ".join(columns)
+    values = [c for c in columns if c != "id"]
+    statements = [
+        # temp tables are never auto-analyzed; without stats the joins below
+        # can be planned as nested loops
+        ("", f"ANALYZE {STAGING_TABLE}"),
+        # the last row wins when the file repeats an id
+        (
+            "skipped",
+            f"DELETE FROM {STAGING_TABLE} WHERE _line IN ("
+            "SELECT _line FROM (SELECT id, _line, row_number() OVER "
+            f"(PARTITION BY id ORDER BY _line DESC) AS n FROM {STAGING_TABLE}) d "
+            "WHERE id IS NULL OR n > 1)",
+        ),
+    ]
+    if values:
+        assignments = ", ".join(f"{c} = s.{c}" for c in values)
+        changed = " OR ".join(f"h.{c} IS DISTINCT FROM s.{c}" for c in values)
+        statements.append(
+            (
+                "updated",
+                f"UPDATE hospitals h SET {assignments} FROM {STAGING_TABLE} s "
+                f"WHERE h.id = s.id AND ({changed})",
+            )
+        )
+    statements.append(
+        (
+            "inserted",
+            f"INSERT INTO hospitals ({cols}) SELECT {cols} FROM {STAGING_TABLE} s "
+            "WHERE NOT EXISTS (SELECT 1 FROM hospitals h WHERE h.id = s.id)",
+        )
+    )
+    if prune:
+        statements.append(
+            (
+                "deleted",
+                f"DELETE FROM hospitals h "
+                f"WHERE NOT EXISTS (SELECT 1 FROM {STAGING_TABLE} s WHERE s.id = h.id)",
+            )
+        )
+    return statements
+
+
+async def notify_reloaded(conn: AsyncConnection, payload: str) -> None:
+    await conn.execute(
+        text("SELECT pg_notify(:channel, :payload)"),
+        {"channel": HOSPITAL_RELOAD_CHANNEL, "payload": payload},
+    )
+    await conn.commit()
+
+
+async def ingest_file(
+    conn: AsyncConnection,
+    path: Path,
+    fmt: str | None = None,
+    prune: bool = False,
+    notify: bool = True,
+) -> dict:
+    """Load ``path`` into hospitals in one transaction and return a report.
+
+    With ``notify`` the reload notification is sent on commit; pass False
+    when something else (the snapshot) must be rebuilt first, and call
+    notify_reloaded afterwards.
+    """
+    fmt = fmt or _detect_format(path)
+    raw = (await conn.get_raw_connection()).driver_connection
+    started = time.perf_counter()
+    async with raw.transaction():
+        async with raw.cursor() as cursor:
+            staging_cols = ", ".join(f"{c} {t}" for c, t in INGEST_COLUMNS.items())
+            await cursor.execute(
+                f"CREATE TEMP TABLE {STAGING_TABLE} "
+                f"({staging_cols}, _line bigserial) ON COMMIT DROP"
+            )
+            copy = _copy_csv if fmt == "csv" else _copy_json
+            columns, rows = await copy(cursor, path)
+            copied = time.perf_counter()
+            if prune and not rows:
+                raise IngestError("refusing to prune with an empty file")
+            if "name" not in columns:
+                # new hospitals need a name; updates of existing ones do not
+                await cursor.execute(
+                    f"SELECT 1 FROM {STAGING_TABLE} s WHERE s.id IS NOT NULL AND "
+                    "NOT EXISTS (SELECT 1 FROM hospitals h WHERE h.id = s.id) LIMIT 1"
+                )
+                if await cursor.fetchone():
+                    raise IngestError("the file adds hospitals but has no name column")
+
+            counts = {"skipped": 0, "updated": 0, "inserted": 0, "deleted": 0}
+            for key, sql in _merge_sql(columns, prune):
+                await cursor.execute(sql)
+                if key:
+                    counts[key] = cursor.rowcount
+            # ids come from the file; keep the serial ahead of them
+            await cursor.execute(
+                "SELECT setval(pg_get_serial_sequence('hospitals', 'id'), "
+                "GREATEST(COALESCE(max(id), 0), 1)) FROM hospitals"
+            )
+            if notify:
+                await cursor.execute(
+                    "SELECT pg_notify(%s, %s)", (HOSPITAL_RELOAD_CHANNEL, path.name)
+                )
+    merged = time.perf_counter()
+    # outside the transaction so the planner sees the new data right away
+    async with raw.transaction(), raw.cursor() as cursor:
+        await cursor.execute("ANALYZE hospitals")
+
+    elapsed = merged - started
+    return {
+        "rows": rows,
+        **counts,
+        "unchanged": rows - counts["skipped"] - counts["inserted"] - counts["updated"],
+        "copy_sec": round(copied - started, 3),
+        "merge_sec": round(merged - copied, 3),
+        "rows_per_sec": round(rows / elapsed) if elapsed > 0 else rows,
+    }
+
+
+async def _main(path: Path, fmt: str | None, prune: bool) -> None:
+    rebuild = bool(HOSPITAL_SNAPSHOT_PATH)
+    async with db.engine.connect() as conn:
+        report = await ingest_file(conn, path, fmt=fmt, prune=prune, notify=not rebuild)
+        if rebuild:
+            # the notification also makes workers re-stat the snapshot file
+            async with db.async_session() as session:
+                report["snapshot"] = await build_snapshot(session, HOSPITAL_SNAPSHOT_PATH)
+            await notify_reloaded(conn, path.name)
+    await db.engine.dispose()
+    # this process's caches; API processes are told through the notification
+    invalidate_hospital_caches()
+    print(report)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load hospitals from a CSV or JSON file.")
+    parser.add_argument("path", type=Path)
+    parser.add_argument("--format", choices=["csv", "json"], default=None)
+    parser.add_argument(
+        "--prune", action="store_true", help="delete hospitals that are not in the file"
+    )
+    args = parser.parse_args()
+    asyncio.run(_main(args.path, args.format, args.prune))
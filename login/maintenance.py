@@ -0,0 +1,216 @@
+"""
+refresh_tokens housekeeping.
+
+Every login and refresh inserts a row and nothing deletes them, so this purges
+expired tokens and revoked tokens past a grace period in small batches (each
+batch its own short transaction, so the purge never holds many row locks).
+Revoked tokens are kept for TOKEN_REVOKED_GRACE_HOURS so reuse of a rotated
+token is still detected.
+
+If the table was converted with migrations/005_refresh_tokens_partitioned.sql,
+weekly partitions are also created ahead of time and fully expired ones are
+dropped, which removes a week of rows without scanning them.
+
+Runs periodically inside the app (every TOKEN_REAPER_INTERVAL_SEC, 0 turns it
+off) or once from the command line: python -m login.maintenance [--batch-size N]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import time
+from datetime import date, datetime, timedelta, timezone
+
+from dotenv import load_dotenv
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+if __name__ == "__main__":
+    # as a script, load .env before db/config read it (app.py does the same)
+    load_dotenv(override=True)
+
+from login import db
+
+TOKEN_REAPER_INTERVAL_SEC = float(os.getenv("TOKEN_REAPER_INTERVAL_SEC", "3600"))
+TOKEN_REAPER_BATCH_SIZE = int(os.getenv("TOKEN_REAPER_BATCH_SIZE", "1000"))
+TOKEN_REVOKED_GRACE_HOURS = float(os.getenv("TOKEN_REVOKED_GRACE_HOURS", "24"))
+# how far past "now" weekly partitions are created; must cover REFRESH_EXPIRE_DAYS
+TOKEN_PARTITION_AHEAD_DAYS = int(os.getenv("TOKEN_PARTITION_AHEAD_DAYS", "21"))
+
+PARTITION_PREFIX = "refresh_tokens_p"
+
+logger = logging.getLogger(__name__)
+
+_PURGE_BATCH = text(
+    """
+    DELETE FROM refresh_tokens
+    WHERE id IN (
+        SELECT id FROM refresh_tokens
+        WHERE expires_at < now()
+           OR (revoked AND created_at < now() - make_interval(secs => :grace_sec))
+        LIMIT :batch_size
+        FOR UPDATE SKIP LOCKED
+    )
+    """
+)
+
+
+async def purge_refresh_tokens(
+    session: AsyncSession, batch_size: int, revoked_grace_hours: float
+) -> int:
+    """Delete expired and stale revoked tokens, ``batch_size`` rows per transaction."""
+    purged = 0
+    while True:
+        result = await session.execute(
+            _PURGE_BATCH,
+            {"grace_sec": revoked_grace_hours * 3600, "batch_size": batch_size},
+        )
+        await session.commit()
+        purged += result.rowcount
+        if result.rowcount < batch_size:
+            return purged
+
+
+def _week_start(day: date) -> date:
+    return day - timedelta(days=day.weekday())
+
+
+async def is_partitioned(session: AsyncSession) -> bool:
+    result = await session.execute(
+        text(
+            "SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid "
+            "WHERE c.relname = 'refresh_tokens' AND c.relnamespace = current_schema()::regnamespace"
+        )
+    )
+    return result.first() is not None
+
+
+async def _partition_names(session: AsyncSession) -> list[str]:
+    result = await session.execute(
+        text(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid "
+            "JOIN pg_class p ON p.oid = i.inhparent "
+            "WHERE p.relname = 'refresh_tokens' AND p.relnamespace = current_schema()::regnamespace"
+        )
+    )
+    return [name for (name,) in result.all()]
+
+
+async def ensure_partitions(session: AsyncSession, ahead_days: int) -> list[str]:
+    """Create the weekly partitions (Monday to Monday, UTC) up to ``ahead_days`` out."""
+    existing = set(await _partition_names(session))
+    today = datetime.now(timezone.utc).date()
+    created = []
+    week = _week_start(today)
+    while week <= today + timedelta(days=ahead_days):
+        name = f"{PARTITION_PREFIX}{week:%Y%m%d}"
+        if name not in existing:
+            upper = week + timedelta(days=7)
+            await session.execute(
+                text(
+                    f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF refresh_tokens "
+                    f"FOR VALUES FROM ('{week.isoformat()} 00:00+00') TO ('{upper.isoformat()} 00:00+00')"
+                )
+            )
+            created.append(name)
+        week += timedelta(days=7)
+    await session.commit()
+    return created
+
+
+async def drop_expired_partitions(session: AsyncSession) -> list[str]:
+    """Drop weekly partitions whose whole range is already in the past."""
+    this_week = _week_start(datetime.now(timezone.utc).date())
+    dropped = []
+    for name in await _partition_names(session):
+        if not name.startswith(PARTITION_PREFIX):
+            continue  # the default partition
+        try:
+            week = datetime.strptime(name[len(PARTITION_PREFIX):], "%Y%m%d").date()
+        except ValueError:
+            continue
+        if week + timedelta(days=7) <= this_week:
+            await session.execute(text(f"DROP TABLE {name}"))
+            dropped.append(name)
+    await session.commit()
+    return dropped
+
+
+async def run_once(
+    session: AsyncSession,
+    batch_size: int = TOKEN_REAPER_BATCH_SIZE,
+    revoked_grace_hours: float = TOKEN_REVOKED_GRACE_HOURS,
+    partition_ahead_days: int = TOKEN_PARTITION_AHEAD_DAYS,
+) -> dict:
+    report = {"partitions_created": [], "partitions_dropped": []}
+    if await is_partitioned(session):
+        report["partitions_created"] = await ensure_partitions(session, partition_ahead_days)
+        report["partitions_dropped"] = await drop_expired_partitions(session)
+    report["purged"] = await purge_refresh_tokens(session, batch_size, revoked_grace_hours)
+    return report
+
+
+class TokenReaper:
+    def __init__(self, interval: float, session_factory) -> None:
+        self.interval = interval
+        self.session_factory = session_factory
+        self.runs = 0
+        self.purged = 0
+        self.failures = 0
+        self.last_error: str | None = None
+        self.last_run_at: float | None = None
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        if self.interval > 0 and self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+
+    async def _loop(self) -> None:
+        while True:
+            try:
+                async with self.session_factory() as session:
+                    report = await run_once(session)
+                self.purged += report["purged"]
+                self.runs += 1
+            except Exception as exc:
+                # a failed pass is retried on the next tick
+                self.failures += 1
+                self.last_error = repr(exc)
+                logger.exception("refresh token purge failed; retrying in %gs", self.interval)
+            self.last_run_at = time.time()
+            await asyncio.sleep(self.interval)
+
+    def stats(self) -> dict:
+        return {
+            "interval": self.interval,
+            "runs": self.runs,
+            "purged": self.purged,
+            "failures": self.failures,
+            "last_error": self.last_error,
+            "last_run_at": self.last_run_at,
+        }
+
+
+token_reaper = TokenReaper(interval=TOKEN_REAPER_INTERVAL_SEC, session_factory=db.async_session)
+
+
+async def _main(batch_size: int) -> None:
+    async with db.async_session() as session:
+        report = await run_once(session, batch_size=batch_size)
+    await db.engine.dispose()
+    print(report)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Purge expired/revoked refresh tokens.")
+    parser.add_argument("--batch-size", type=int, default=TOKEN_REAPER_BATCH_SIZE)
+    args = parser.parse_args()
+    asyncio.run(_main(args.batch_size))
@@ -0,0 +1,6 @@
+-- Optional: trigram index for HOSPITAL_SEARCH_BACKEND=pg_trgm.
+-- A leading-wildcard ILIKE cannot use the btree idx_hospitals_name; a GIN
+-- trigram index can, and similarity() ranks the matches.
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX IF NOT EXISTS idx_hospitals_name_trgm ON hospitals USING gin (name gin_trgm_ops);
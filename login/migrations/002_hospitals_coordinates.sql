@@ -0,0 +1,3 @@
+-- Hospital coordinates for nearest-hospital queries (GET /hospitals?lat=&lon=).
+ALTER TABLE hospitals ADD COLUMN IF NOT EXISTS latitude DOUBLE PRECISION;
+ALTER TABLE hospitals ADD COLUMN IF NOT EXISTS longitude DOUBLE PRECISION;
@@ -0,0 +1,8 @@
+-- Optional: spatial index for HOSPITAL_GEO_BACKEND=earthdistance.
+-- ORDER BY ll_to_earth(...) <-> ll_to_earth(:lat, :lon) is a KNN scan on this index.
+CREATE EXTENSION IF NOT EXISTS cube;
+CREATE EXTENSION IF NOT EXISTS earthdistance;
+
+CREATE INDEX IF NOT EXISTS idx_hospitals_earth
+    ON hospitals USING gist (ll_to_earth(latitude, longitude))
+    WHERE latitude IS NOT NULL AND longitude IS NOT NULL;
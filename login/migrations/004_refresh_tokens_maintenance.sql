@@ -0,0 +1,5 @@
+-- Indexes for the refresh-token reaper (login/maintenance.py): it deletes by
+-- expires_at and by (revoked, created_at) in small batches.
+CREATE INDEX IF NOT EXISTS idx_refresh_tokens_expires_at ON refresh_tokens (expires_at);
+CREATE INDEX IF NOT EXISTS idx_refresh_tokens_revoked_created_at
+    ON refresh_tokens (created_at) WHERE revoked;
@@ -0,0 +1,60 @@
+-- Optional: range-partition refresh_tokens by expires_at into weekly partitions
+-- (refresh_tokens_pYYYYMMDD, Monday 00:00 UTC to the next Monday). Once a whole
+-- week has expired, login/maintenance.py drops that partition instead of
+-- deleting its rows. The reaper also creates partitions ahead of time.
+--
+-- A unique constraint on a partitioned table has to include the partition key,
+-- so token uniqueness is no longer enforced by the database. That is safe for
+-- tokens from secrets.token_urlsafe(48), but the lookup index is not unique.
+-- Run once, during a quiet period; it copies the table.
+BEGIN;
+
+ALTER TABLE refresh_tokens RENAME TO refresh_tokens_old;
+ALTER TABLE refresh_tokens_old RENAME CONSTRAINT refresh_tokens_pkey TO refresh_tokens_old_pkey;
+DROP INDEX IF EXISTS idx_refresh_tokens_token_hash;
+DROP INDEX IF EXISTS idx_refresh_tokens_user_id;
+DROP INDEX IF EXISTS idx_refresh_tokens_expires_at;
+DROP INDEX IF EXISTS idx_refresh_tokens_revoked_created_at;
+
+-- same columns as before (works before and after migrations/006)
+CREATE TABLE refresh_tokens (
+    LIKE refresh_tokens_old INCLUDING DEFAULTS,
+    PRIMARY KEY (id, expires_at)
+) PARTITION BY RANGE (expires_at);
+ALTER TABLE refresh_tokens
+    ADD FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE;
+
+CREATE TABLE refresh_tokens_default PARTITION OF refresh_tokens DEFAULT;
+
+DO $$
+DECLARE
+    week DATE := date_trunc('week', LEAST(now(), (SELECT min(expires_at) FROM refresh_tokens_old)) AT TIME ZONE 'UTC')::date;
+BEGIN
+    WHILE week <= (now() AT TIME ZONE 'UTC')::date + 21 LOOP
+        EXECUTE format(
+            'CREATE TABLE refresh_tokens_p%s PARTITION OF refresh_tokens FOR VALUES FROM (%L) TO (%L)',
+            to_char(week, 'YYYYMMDD'), week::text || ' 00:00+00', (week + 7)::text || ' 00:00+00'
+        );
+        week := week + 7;
+    END LOOP;
+
+    IF EXISTS (
+        SELECT 1 FROM information_schema.columns
+        WHERE table_name = 'refresh_tokens' AND column_name = 'token_hash'
+    ) THEN
+        CREATE INDEX idx_refresh_tokens_token_hash ON refresh_tokens USING hash (token_hash);
+    ELSE
+        CREATE INDEX idx_refresh_tokens_token ON refresh_tokens (token);
+    END IF;
+END $$;
+
+CREATE INDEX idx_refresh_tokens_user_id ON refresh_tokens (user_id);
+CREATE INDEX idx_refresh_tokens_expires_at ON refresh_tokens (expires_at);
+CREATE INDEX idx_refresh_tokens_revoked_created_at ON refresh_tokens (created_at) WHERE revoked;
+
+INSERT INTO refresh_tokens SELECT * FROM refresh_tokens_old;
+
+ALTER SEQUENCE refresh_tokens_id_seq OWNED BY refresh_tokens.id;
+DROP TABLE refresh_tokens_old;
+
+COMMIT;
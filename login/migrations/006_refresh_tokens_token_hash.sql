@@ -0,0 +1,17 @@
+-- Store refresh tokens as a 32-byte SHA-256 digest instead of the raw string.
+-- Lookups go through a hash index on the digest; the raw token is dropped so it
+-- never sits at rest. Deploy together with the code that writes token_hash:
+-- tokens issued before the migration keep working because their digest is
+-- backfilled from the stored value.
+BEGIN;
+
+ALTER TABLE refresh_tokens ADD COLUMN IF NOT EXISTS token_hash BYTEA;
+UPDATE refresh_tokens SET token_hash = sha256(convert_to(token, 'UTF8')) WHERE token_hash IS NULL;
+ALTER TABLE refresh_tokens ALTER COLUMN token_hash SET NOT NULL;
+
+CREATE INDEX IF NOT EXISTS idx_refresh_tokens_token_hash ON refresh_tokens USING hash (token_hash);
+CREATE INDEX IF NOT EXISTS idx_refresh_tokens_user_id ON refresh_tokens (user_id);
+
+ALTER TABLE refresh_tokens DROP COLUMN token;
+
+COMMIT;
@@ -0,0 +1,5 @@
+-- Per-user session generation for "log out everywhere" (POST /auth/logout-all).
+-- Access tokens carry the generation as the "gen" claim and refresh tokens store
+-- it; bumping users.session_gen invalidates both without touching refresh_tokens.
+ALTER TABLE users ADD COLUMN IF NOT EXISTS session_gen INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE refresh_tokens ADD COLUMN IF NOT EXISTS session_gen INTEGER NOT NULL DEFAULT 0;
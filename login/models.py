@@ -1,6 +1,16 @@
 from datetime import datetime
 
-from sqlalchemy import Boolean, DateTime, Float, ForeignKey, Integer, String, func
+from sqlalchemy import (
+    Boolean,
+    DateTime,
+    Float,
+    ForeignKey,
+    Index,
+    Integer,
+    LargeBinary,
+    String,
+    func,
+)
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import Mapped, mapped_column, relationship as sa_relationship
 
@@ -13,6 +23,8 @@ class User(Base):
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     email: Mapped[str] = mapped_column(String(255), unique=True, index=True, nullable=False)
     password_hash: Mapped[str] = mapped_column(String(255), nullable=False)
+    # bumped by "log out everywhere"; tokens from older generations are rejected
+    session_gen: Mapped[int] = mapped_column(Integer, nullable=False, server_default="0")
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), server_default=func.now(), nullable=False
     )
@@ -20,23 +32,36 @@ class User(Base):
         DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False
     )
 
+    # Child rows are removed by the database (ON DELETE CASCADE); passive_deletes
+    # keeps the ORM from loading them just to delete them one by one.
     refresh_tokens: Mapped[list["RefreshToken"]] = sa_relationship(
-        "RefreshToken", back_populates="user", cascade="all, delete-orphan"
+        "RefreshToken", back_populates="user", cascade="all, delete-orphan", passive_deletes=True
     )
     profile: Mapped["UserProfile | None"] = sa_relationship(
-        "UserProfile", back_populates="user", uselist=False, cascade="all, delete-orphan"
+        "UserProfile",
+        back_populates="user",
+        uselist=False,
+        cascade="all, delete-orphan",
+        passive_deletes=True,
     )
     family_members: Mapped[list["UserFamily"]] = sa_relationship(
-        "UserFamily", back_populates="user", cascade="all, delete-orphan"
+        "UserFamily", back_populates="user", cascade="all, delete-orphan", passive_deletes=True
     )
 
 
 class RefreshToken(Base):
     __tablename__ = "refresh_tokens"
+    __table_args__ = (
+        Index("idx_refresh_tokens_token_hash", "token_hash", postgresql_using="hash"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
-    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), index=True, nullable=False)
-    token: Mapped[str] = mapped_column(String(255), unique=True, index=True, nullable=False)
+    user_id: Mapped[int] = mapped_column(
+        ForeignKey("users.id", ondelete="CASCADE"), index=True, nullable=False
+    )
+    # SHA-256 of the token handed to the client (crud.token_digest)
+    token_hash: Mapped[bytes] = mapped_column(LargeBinary(32), nullable=False)
+    session_gen: Mapped[int] = mapped_column(Integer, nullable=False, server_default="0")
     revoked: Mapped[bool] = mapped_column(Boolean, default=False, nullable=False)
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), server_default=func.now(), nullable=False
@@ -50,7 +75,9 @@ class UserProfile(Base):
     __tablename__ = "user_profiles"
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
-    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), unique=True, nullable=False)
+    user_id: Mapped[int] = mapped_column(
+        ForeignKey("users.id", ondelete="CASCADE"), unique=True, nullable=False
+    )
     name: Mapped[str | None] = mapped_column(String(100), nullable=True)
     birth_date: Mapped[str | None] = mapped_column(String(20), nullable=True)
     gender: Mapped[str | None] = mapped_column(String(10), nullable=True)
@@ -76,6 +103,8 @@ class Hospital(Base):
     is_open: Mapped[bool] = mapped_column(Boolean, nullable=False, default=True)
     distance_km: Mapped[float | None] = mapped_column(Float, nullable=True)
     address: Mapped[str | None] = mapped_column(String(255), nullable=True)
+    latitude: Mapped[float | None] = mapped_column(Float, nullable=True)
+    longitude: Mapped[float | None] = mapped_column(Float, nullable=True)
     er_beds: Mapped[int | None] = mapped_column(Integer, nullable=True)
     operating_rooms: Mapped[int | None] = mapped_column(Integer, nullable=True)
     created_at: Mapped[datetime] = mapped_column(
@@ -87,7 +116,9 @@ class UserFamily(Base):
     __tablename__ = "user_families"
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
-    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), index=True, nullable=False)
+    user_id: Mapped[int] = mapped_column(
+        ForeignKey("users.id", ondelete="CASCADE"), index=True, nullable=False
+    )
     relationship: Mapped[str] = mapped_column(String(10), nullable=False)
     name: Mapped[str | None] = mapped_column(String(100), nullable=True)
     birth_date: Mapped[str | None] = mapped_column(String(20), nullable=True)
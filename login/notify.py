@@ -0,0 +1,114 @@
+"""
+Postgres LISTEN/NOTIFY, used to tell every API process about a change that
+one of them (or an out-of-band job) made.
+
+Senders run ``SELECT pg_notify(channel, payload)`` in the transaction that
+makes the change, so the message goes out on commit and never for a rollback.
+Each receiving process runs a NotifyListener per channel on its own connection.
+"""
+import asyncio
+import logging
+import time
+from abc import ABC, abstractmethod
+
+import psycopg
+from sqlalchemy import text
+from sqlalchemy.engine import make_url
+
+from login import db
+
+logger = logging.getLogger(__name__)
+
+# libpq form of DATABASE_URL (without the +psycopg driver suffix)
+LISTEN_CONNINFO = make_url(db.DATABASE_URL).set(drivername="postgresql").render_as_string(
+    hide_password=False
+)
+
+
+async def notify(session, channel: str, payload: str) -> None:
+    """Queue a NOTIFY on ``session``'s transaction; it is sent when that commits."""
+    await session.execute(
+        text("SELECT pg_notify(:channel, :payload)"), {"channel": channel, "payload": payload}
+    )
+
+
+class NotifyListener(ABC):
+    """LISTENs on ``channel`` over a dedicated connection and calls ``on_notify``.
+
+    The connection is reopened after a failure, waiting ``retry_sec`` and
+    doubling up to ``max_retry_sec`` while failures repeat. Messages sent while
+    disconnected are lost, so ``on_reconnect`` runs once the channel is
+    listened to again and must make up for any of them.
+    """
+
+    channel: str
+    name: str
+
+    def __init__(
+        self,
+        enabled: bool,
+        conninfo: str = LISTEN_CONNINFO,
+        retry_sec: float = 5.0,
+        max_retry_sec: float = 300.0,
+    ) -> None:
+        self.enabled = enabled
+        self.conninfo = conninfo
+        self.retry_sec = retry_sec
+        self.max_retry_sec = max_retry_sec
+        self.received = 0
+        self.reconnects = 0
+        self.failures = 0
+        self.last_error: str | None = None
+        self.last_received_at: float | None = None
+        self._task: asyncio.Task | None = None
+
+    @abstractmethod
+    def on_notify(self, payload: str) -> None:
+        ...
+
+    @abstractmethod
+    def on_reconnect(self) -> None:
+        ...
+
+    def start(self) -> None:
+        if self.enabled and self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+
+    async def _loop(self) -> None:
+        delay = self.retry_sec
+        while True:
+            try:
+                conn = await psycopg.AsyncConnection.connect(self.conninfo, autocommit=True)
+                async with conn:
+                    await conn.execute(f"LISTEN {self.channel}")
+                    delay = self.retry_sec
+                    if self.reconnects:
+                        self.on_reconnect()
+                    async for message in conn.notifies():
+                        self.on_notify(message.payload)
+                        self.received += 1
+                        self.last_received_at = time.time()
+            except Exception as exc:
+                self.failures += 1
+                self.last_error = repr(exc)
+                logger.exception("%s listener failed; retrying in %gs", self.name, delay)
+            self.reconnects += 1
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.max_retry_sec)
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "received": self.received,
+            "reconnects": self.reconnects,
+            "failures": self.failures,
+            "last_error": self.last_error,
+            "last_received_at": self.last_received_at,
+        }
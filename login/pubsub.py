@@ -0,0 +1,78 @@
+"""
+In-process publish/subscribe for pushing events to streaming clients.
+
+Publishing never blocks: each subscriber has a bounded queue, and when a slow
+consumer's queue is full its oldest event is dropped and counted so the
+consumer can resynchronize (e.g. by sending a fresh snapshot).
+"""
+import asyncio
+import os
+from collections import defaultdict
+
+PUBSUB_QUEUE_SIZE = int(os.getenv("PUBSUB_QUEUE_SIZE", "64"))
+
+
+class Subscription:
+    def __init__(self, topic: str, maxsize: int) -> None:
+        self.topic = topic
+        self.queue: asyncio.Queue[dict] = asyncio.Queue(maxsize=maxsize)
+        self.dropped = 0
+
+    def offer(self, event: dict) -> None:
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(event)
+
+    async def get(self) -> dict:
+        return await self.queue.get()
+
+    def take_dropped(self) -> int:
+        dropped, self.dropped = self.dropped, 0
+        return dropped
+
+    def drain(self) -> int:
+        """Discard the queued events, e.g. before sending a fresh snapshot."""
+        drained = self.queue.qsize()
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        return drained
+
+
+class Broker:
+    def __init__(self, queue_size: int) -> None:
+        self.queue_size = queue_size
+        self._subscribers: dict[str, set[Subscription]] = defaultdict(set)
+        self.published = 0
+        self.dropped = 0
+
+    def subscribe(self, topic: str) -> Subscription:
+        sub = Subscription(topic, self.queue_size)
+        self._subscribers[topic].add(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscription) -> None:
+        subs = self._subscribers.get(sub.topic)
+        if subs is None:
+            return
+        subs.discard(sub)
+        if not subs:
+            del self._subscribers[sub.topic]
+
+    def publish(self, topic: str, event: dict) -> None:
+        self.published += 1
+        for sub in self._subscribers.get(topic, ()):
+            before = sub.dropped
+            sub.offer(event)
+            self.dropped += sub.dropped - before
+
+    def stats(self) -> dict:
+        return {
+            "topics": len(self._subscribers),
+            "subscribers": sum(len(s) for s in self._subscribers.values()),
+            "published": self.published,
+            "dropped": self.dropped,
+        }
+
+
+broker = Broker(queue_size=PUBSUB_QUEUE_SIZE)
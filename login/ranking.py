@@ -0,0 +1,199 @@
+"""
+Auto-call target ranking.
+
+Hospital attributes are kept as NumPy columns (one array per attribute, rows
+sorted by id) so a trigger scores every candidate in a single vectorized pass
+instead of looking hospitals up one at a time.
+"""
+import os
+from dataclasses import dataclass
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from login import db
+from login.cache import RefreshingIndex
+from login.geo import EARTH_RADIUS_KM
+from login.models import Hospital
+
+HOSPITAL_RANKING_REFRESH_SEC = float(os.getenv("HOSPITAL_RANKING_REFRESH_SEC", "60"))
+
+
+@dataclass(frozen=True)
+class RankingWeights:
+    distance: float = 3.0
+    er_beds: float = 2.0
+    operating_rooms: float = 1.0
+    is_open: float = 5.0
+    # proximity score is exp(-distance / distance_scale_km)
+    distance_scale_km: float = 10.0
+
+    @classmethod
+    def from_env(cls) -> "RankingWeights":
+        defaults = cls()
+        return cls(
+            distance=float(os.getenv("AUTOCALL_WEIGHT_DISTANCE", defaults.distance)),
+            er_beds=float(os.getenv("AUTOCALL_WEIGHT_ER_BEDS", defaults.er_beds)),
+            operating_rooms=float(
+                os.getenv("AUTOCALL_WEIGHT_OPERATING_ROOMS", defaults.operating_rooms)
+            ),
+            is_open=float(os.getenv("AUTOCALL_WEIGHT_IS_OPEN", defaults.is_open)),
+            distance_scale_km=float(
+                os.getenv("AUTOCALL_DISTANCE_SCALE_KM", defaults.distance_scale_km)
+            ),
+        )
+
+
+@dataclass(frozen=True)
+class RankedHospital:
+    hospital_id: int
+    score: float
+    distance_km: float | None
+
+
+def _nullable(values) -> np.ndarray:
+    # NULL is kept as NaN so bed_status can send it back as null
+    return np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+
+
+def _to_json(value: float) -> int | None:
+    return None if np.isnan(value) else int(value)
+
+
+class HospitalColumns:
+    def __init__(self, rows: list[tuple]) -> None:
+        rows = sorted(rows)
+        self.ids = np.array([r[0] for r in rows], dtype=np.int64)
+        self.is_open = np.array([bool(r[1]) for r in rows], dtype=bool)
+        self.er_beds = _nullable(r[2] for r in rows)
+        self.operating_rooms = _nullable(r[3] for r in rows)
+        self.lat = np.array([np.nan if r[4] is None else r[4] for r in rows], dtype=np.float64)
+        self.lon = np.array([np.nan if r[5] is None else r[5] for r in rows], dtype=np.float64)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _find(self, ids: np.ndarray) -> np.ndarray:
+        """Row position of each of ``ids``, -1 where the id is unknown."""
+        pos = np.searchsorted(self.ids, ids)
+        found = pos < len(self.ids)
+        found[found] = self.ids[pos[found]] == ids[found]
+        return np.where(found, pos, -1)
+
+    def positions(self, hospital_ids) -> np.ndarray:
+        """Row positions of the known ids among ``hospital_ids`` (unknown ids dropped)."""
+        wanted = np.sort(np.asarray(hospital_ids, dtype=np.int64))
+        if len(wanted) > 1:
+            wanted = wanted[np.concatenate(([True], wanted[1:] != wanted[:-1]))]
+        pos = self._find(wanted)
+        return pos[pos >= 0]
+
+    def update_beds(self, changes) -> None:
+        """Overwrite is_open/er_beds/operating_rooms for known hospitals in place.
+
+        ``changes`` are rows with id, is_open, er_beds and operating_rooms;
+        ids that are not in the columns yet are left for the next rebuild.
+        """
+        if not changes:
+            return
+        pos = self._find(np.array([c.id for c in changes], dtype=np.int64))
+        found = pos >= 0
+        pos = pos[found]
+        self.is_open[pos] = np.array([bool(c.is_open) for c in changes], dtype=bool)[found]
+        self.er_beds[pos] = _nullable(c.er_beds for c in changes)[found]
+        self.operating_rooms[pos] = _nullable(c.operating_rooms for c in changes)[found]
+
+    def bed_status(self, hospital_ids) -> list[dict]:
+        """Bed columns of the known ids among ``hospital_ids``, in the order given.
+
+        A repeated id is reported once, at its first position; unknown ids are left out.
+        """
+        pos = self._find(np.fromiter(dict.fromkeys(hospital_ids), dtype=np.int64))
+        pos = pos[pos >= 0]
+        return [
+            {"hospital_id": i, "is_open": o, "er_beds": _to_json(b), "operating_rooms": _to_json(r)}
+            for i, o, b, r in zip(
+                self.ids[pos].tolist(),
+                self.is_open[pos].tolist(),
+                self.er_beds[pos].tolist(),
+                self.operating_rooms[pos].tolist(),
+            )
+        ]
+
+    def rank(
+        self,
+        hospital_ids,
+        weights: RankingWeights,
+        lat: float | None = None,
+        lon: float | None = None,
+        limit: int | None = None,
+    ) -> list[RankedHospital]:
+        pos = self.positions(hospital_ids)
+        if not len(pos):
+            return []
+
+        # unknown capacity scores like none
+        beds = np.nan_to_num(self.er_beds[pos], nan=0.0)
+        rooms = np.nan_to_num(self.operating_rooms[pos], nan=0.0)
+        # normalize capacity within the candidate set so weights stay comparable
+        score = weights.is_open * self.is_open[pos]
+        score = score + weights.er_beds * beds / max(beds.max(), 1.0)
+        score = score + weights.operating_rooms * rooms / max(rooms.max(), 1.0)
+
+        distance = None
+        if lat is not None and lon is not None:
+            p1, p2 = np.radians(lat), np.radians(self.lat[pos])
+            dp, dl = p2 - p1, np.radians(self.lon[pos] - lon)
+            a = np.sin(dp / 2) ** 2 + np.cos(p1) * np.cos(p2) * np.sin(dl / 2) ** 2
+            distance = 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+            # hospitals without coordinates get no proximity credit
+            proximity = np.nan_to_num(np.exp(-distance / weights.distance_scale_km), nan=0.0)
+            score = score + weights.distance * proximity
+
+        # ties go to the lower id, like every other hospital listing
+        order = np.lexsort((self.ids[pos], -score))
+        if limit is not None:
+            order = order[:limit]
+        ids = self.ids[pos][order].tolist()
+        scores = score[order].tolist()
+        distances = (
+            [None if np.isnan(d) else d for d in distance[order].tolist()]
+            if distance is not None
+            else [None] * len(ids)
+        )
+        return [RankedHospital(i, s, d) for i, s, d in zip(ids, scores, distances)]
+
+
+class HospitalRanking(RefreshingIndex):
+    async def load(self, session: AsyncSession) -> list[tuple]:
+        result = await session.execute(
+            select(
+                Hospital.id,
+                Hospital.is_open,
+                Hospital.er_beds,
+                Hospital.operating_rooms,
+                Hospital.latitude,
+                Hospital.longitude,
+            )
+        )
+        return [tuple(row) for row in result.all()]
+
+    def build(self, rows: list[tuple]) -> HospitalColumns:
+        return HospitalColumns(rows)
+
+    def patch(self, index: HospitalColumns, changes) -> None:
+        index.update_beds(changes)
+
+    def stats(self) -> dict:
+        return {
+            "rows": len(self.index) if self.index else 0,
+            "rebuilds": self.rebuilds,
+            "patches": self.patches,
+        }
+
+
+ranking_weights = RankingWeights.from_env()
+hospital_ranking = HospitalRanking(
+    refresh_sec=HOSPITAL_RANKING_REFRESH_SEC, session_factory=db.async_session
+)
@@ -0,0 +1,37 @@
+"""
+Response classes shared by the routers.
+
+ModelResponse is the fast path for handlers that already hold validated
+pydantic models. FastAPI re-validates a handler's return value against
+``response_model`` and then serializes it again through ``jsonable_encoder`` +
+``json.dumps``. Returning a ModelResponse skips both: the models are written
+straight to JSON bytes by pydantic-core's serializer. Keep ``response_model=``
+on the route so the OpenAPI schema is unchanged.
+
+EventStreamResponse and sse_event are for server-sent event streams.
+"""
+import json
+
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic_core import to_json
+
+SSE_KEEPALIVE_SEC = 15
+
+
+class ModelResponse(JSONResponse):
+    def render(self, content) -> bytes:
+        return to_json(content)
+
+
+class EventStreamResponse(StreamingResponse):
+    media_type = "text/event-stream"
+
+    def __init__(self, content, **kwargs) -> None:
+        # no-cache and no proxy buffering, or events arrive in bursts
+        headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+        headers.update(kwargs.pop("headers", None) or {})
+        super().__init__(content, headers=headers, **kwargs)
+
+
+def sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
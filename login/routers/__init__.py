@@ -1,5 +1,6 @@
 from .auth import router as auth_router
 from .autocall import router as autocall_router
+from .beds import router as beds_router
 from .family import router as family_router
 from .hospitals import router as hospitals_router
 from .profiles import router as profiles_router
@@ -12,4 +13,5 @@ __all__ = [
     "hospitals_router",
     "family_router",
     "autocall_router",
+    "beds_router",
 ]
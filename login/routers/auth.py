@@ -1,4 +1,4 @@
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 
 from fastapi import APIRouter, Depends, HTTPException, status
 import secrets
@@ -9,8 +9,9 @@ from login.security import (
     ACCESS_EXPIRE_MIN,
     REFRESH_EXPIRE_DAYS,
     create_access_token,
-    hash_password,
-    verify_password,
+    get_current_user,
+    hash_password_async,
+    verify_password_async,
 )
 
 router = APIRouter(tags=["auth"])
@@ -30,42 +31,46 @@ async def register(payload: schemas.UserCreate, session=Depends(get_session)):
     if existing:
         raise HTTPException(status_code=400, detail="email already registered")
 
-    user = await crud.create_user(session, payload.email, hash_password(payload.password))
+    password_hash = await hash_password_async(payload.password)
+    user = await crud.create_user(session, payload.email, password_hash)
     return {"msg": "user created", "id": user.id}
 
 
 @router.post("/auth/login", response_model=schemas.TokenResponse)
 async def login(payload: schemas.UserLogin, session=Depends(get_session)):
     user = await crud.get_user_by_email(session, payload.email)
-    if not user or not verify_password(payload.password, user.password_hash):
+    if not user or not await verify_password_async(payload.password, user.password_hash):
         raise HTTPException(status_code=401, detail="invalid credentials")
 
-    access_token = create_access_token(user.id)
+    access_token = create_access_token(user)
     refresh_token = secrets.token_urlsafe(48)
-    expires_at = datetime.utcnow() + timedelta(days=REFRESH_EXPIRE_DAYS)
-    await crud.create_refresh_token(session, user.id, refresh_token, expires_at)
+    expires_at = datetime.now(timezone.utc) + timedelta(days=REFRESH_EXPIRE_DAYS)
+    await crud.create_refresh_token(session, user.id, refresh_token, expires_at, user.session_gen)
 
     return build_token_response(access_token, refresh_token)
 
 
 @router.post("/auth/refresh", response_model=schemas.TokenResponse)
 async def refresh(req: schemas.RefreshRequest, session=Depends(get_session)):
-    token_obj = await crud.get_refresh_token(session, req.refresh_token)
-    if not token_obj or token_obj.revoked or token_obj.expires_at < datetime.utcnow():
-        raise HTTPException(status_code=401, detail="invalid refresh token")
-
-    await crud.revoke_refresh_token(session, token_obj)
     new_refresh = secrets.token_urlsafe(48)
-    expires_at = datetime.utcnow() + timedelta(days=REFRESH_EXPIRE_DAYS)
-    await crud.create_refresh_token(session, token_obj.user_id, new_refresh, expires_at)
+    expires_at = datetime.now(timezone.utc) + timedelta(days=REFRESH_EXPIRE_DAYS)
+    user = await crud.rotate_refresh_token(session, req.refresh_token, new_refresh, expires_at)
+    if not user:
+        raise HTTPException(status_code=401, detail="invalid refresh token")
 
-    access = create_access_token(token_obj.user_id)
+    access = create_access_token(user)
     return build_token_response(access, new_refresh)
 
 
 @router.post("/auth/logout")
 async def logout(req: schemas.RefreshRequest, session=Depends(get_session)):
-    token_obj = await crud.get_refresh_token(session, req.refresh_token)
-    if token_obj:
-        await crud.revoke_refresh_token(session, token_obj)
+    await crud.revoke_refresh_token(session, req.refresh_token)
     return {"msg": "logged out"}
+
+
+@router.post("/auth/logout-all")
+async def logout_all(user=Depends(get_current_user), session=Depends(get_session)):
+    # one row update revokes every access and refresh token of this user
+    if await crud.bump_session_gen(session, user.id) is None:
+        raise HTTPException(status_code=401, detail="user not found")
+    return {"msg": "logged out everywhere"}
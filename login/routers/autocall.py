@@ -1,16 +1,123 @@
+import asyncio
+
 from fastapi import APIRouter, Depends, HTTPException
 
 from login import schemas
+from login.deps import get_session
+from login.dispatch import DispatchNotConfigured, DispatchQueueFull, dispatcher
+from login.ranking import hospital_ranking, ranking_weights
+from login.responses import SSE_KEEPALIVE_SEC, EventStreamResponse, sse_event
 from login.security import get_current_user
 
 router = APIRouter(tags=["autocall"])
 
 
+def _job_status(job) -> schemas.AutoCallJobStatus:
+    return schemas.AutoCallJobStatus(
+        job_id=job.id,
+        status=job.status,
+        accepted_hospital_id=job.accepted_hospital_id,
+        attempts=[
+            schemas.AutoCallAttempt(
+                hospital_id=a.hospital_id,
+                status=a.status,
+                started_at=a.started_at,
+                finished_at=a.finished_at,
+            )
+            for a in job.attempts.values()
+        ],
+        created_at=job.created_at,
+        finished_at=job.finished_at,
+    )
+
+
 @router.post("/auto-call/trigger")
 async def auto_call_trigger(
-    payload: schemas.AutoCallTriggerRequest, user=Depends(get_current_user)
+    payload: schemas.AutoCallTriggerRequest,
+    user=Depends(get_current_user),
+    session=Depends(get_session),
 ):
     # 최소 조건: 병원 목록이 비어있지 않아야 함
     if not payload.hospital_ids:
         return {"triggered": False}
-    return {"triggered": True}
+    if (payload.latitude is None) != (payload.longitude is None):
+        raise HTTPException(status_code=400, detail="latitude and longitude must be given together")
+
+    columns = await hospital_ranking.get_index(session)
+    ranked = columns.rank(
+        payload.hospital_ids,
+        ranking_weights,
+        payload.latitude,
+        payload.longitude,
+        payload.limit,
+    )
+    if not ranked:
+        return {"triggered": False}
+    try:
+        job = dispatcher.submit(user.id, [r.hospital_id for r in ranked])
+    except DispatchNotConfigured:
+        raise HTTPException(status_code=503, detail="auto-call is not configured")
+    except DispatchQueueFull:
+        raise HTTPException(status_code=503, detail="auto-call queue is full", headers={"Retry-After": "1"})
+    return {
+        "triggered": True,
+        "job_id": job.id,
+        "call_list": [
+            schemas.AutoCallTarget(
+                hospital_id=r.hospital_id,
+                score=round(r.score, 4),
+                distance_km=None if r.distance_km is None else round(r.distance_km, 3),
+            )
+            for r in ranked
+        ],
+    }
+
+
+def _get_own_job(job_id: str, user):
+    job = dispatcher.get(job_id)
+    if not job or job.user_id != user.id:
+        raise HTTPException(status_code=404, detail="auto-call job not found")
+    return job
+
+
+@router.get("/auto-call/{job_id}", response_model=schemas.AutoCallJobStatus)
+async def auto_call_status(job_id: str, user=Depends(get_current_user)):
+    return _job_status(_get_own_job(job_id, user))
+
+
+@router.get("/auto-call/{job_id}/events")
+async def auto_call_events(job_id: str, user=Depends(get_current_user)):
+    """Server-sent events: a ``snapshot`` of the job, then ``attempt``/``job``
+    events until the job finishes. A consumer that falls behind gets a fresh
+    ``snapshot`` in place of the events it missed."""
+    job = _get_own_job(job_id, user)
+
+    async def stream():
+        # subscribe before taking the snapshot so no transition falls in between
+        sub = dispatcher.events.subscribe(dispatcher.topic(job.id))
+        try:
+            # the snapshot already reflects every transition up to job.seq
+            seen = job.seq
+            yield sse_event("snapshot", _job_status(job).model_dump())
+            while not job.done or not sub.queue.empty():
+                if job.done:
+                    event = sub.queue.get_nowait()
+                else:
+                    try:
+                        event = await asyncio.wait_for(sub.get(), SSE_KEEPALIVE_SEC)
+                    except asyncio.TimeoutError:
+                        yield ": keep-alive\n\n"
+                        continue
+                if sub.take_dropped():
+                    sub.drain()
+                    seen = job.seq
+                    yield sse_event("snapshot", _job_status(job).model_dump())
+                    continue
+                if event["seq"] <= seen:
+                    continue
+                seen = event["seq"]
+                yield sse_event(event["type"], event)
+        finally:
+            dispatcher.events.unsubscribe(sub)
+
+    return EventStreamResponse(stream())
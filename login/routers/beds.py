@@ -0,0 +1,81 @@
+import asyncio
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+
+from login import beds, crud, db, schemas
+from login.deps import get_session
+from login.pubsub import broker
+from login.ranking import hospital_ranking
+from login.responses import SSE_KEEPALIVE_SEC, EventStreamResponse, ModelResponse, sse_event
+
+router = APIRouter(tags=["beds"])
+
+MAX_WATCHED_HOSPITALS = 100
+
+
+def require_feed_key(x_bed_feed_key: str | None = Header(default=None)) -> None:
+    if not beds.BED_FEED_SECRET:
+        raise HTTPException(status_code=503, detail="bed feed is not configured")
+    if not beds.check_feed_key(x_bed_feed_key):
+        raise HTTPException(status_code=401, detail="invalid bed feed key")
+
+
+@router.post(
+    "/hospitals/bed-status",
+    response_model=schemas.BedUpdateResult,
+    dependencies=[Depends(require_feed_key)],
+)
+async def update_bed_status(payload: schemas.BedUpdateBatch, session=Depends(get_session)):
+    rows = await crud.apply_bed_updates(session, payload.updates)
+    beds.publish_bed_changes(rows)
+    return ModelResponse(
+        schemas.BedUpdateResult(
+            received=len(payload.updates),
+            changed=[schemas.BedStatus(**beds.bed_status(r)) for r in rows],
+        )
+    )
+
+
+async def _snapshot(hospital_ids: list[int]) -> dict:
+    # a short session of its own: the stream outlives the request's dependencies
+    async with db.async_session() as session:
+        columns = await hospital_ranking.get_index(session)
+    return {"hospitals": columns.bed_status(hospital_ids)}
+
+
+@router.get("/hospitals/bed-status/events")
+async def bed_status_events(hospital_id: list[schemas.Int64] = Query(default=[])):
+    """Server-sent events for the given hospitals: a ``snapshot`` of their bed
+    status, then a ``beds`` event whenever one of them changes. A consumer that
+    falls behind gets a fresh ``snapshot`` in place of the events it missed."""
+    hospital_ids = list(dict.fromkeys(hospital_id))
+    if not 1 <= len(hospital_ids) <= MAX_WATCHED_HOSPITALS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"give between 1 and {MAX_WATCHED_HOSPITALS} hospital_id values",
+        )
+    wanted = set(hospital_ids)
+
+    async def stream():
+        # subscribe before taking the snapshot so no change falls in between
+        sub = broker.subscribe(beds.BED_EVENTS_TOPIC)
+        try:
+            yield sse_event("snapshot", await _snapshot(hospital_ids))
+            while True:
+                try:
+                    event = await asyncio.wait_for(sub.get(), SSE_KEEPALIVE_SEC)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                if sub.take_dropped():
+                    # queued changes are older than the snapshot about to be taken
+                    sub.drain()
+                    yield sse_event("snapshot", await _snapshot(hospital_ids))
+                    continue
+                hospitals = [h for h in event["hospitals"] if h["hospital_id"] in wanted]
+                if hospitals:
+                    yield sse_event("beds", {**event, "hospitals": hospitals})
+        finally:
+            broker.unsubscribe(sub)
+
+    return EventStreamResponse(stream())
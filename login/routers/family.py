@@ -2,6 +2,7 @@ from fastapi import APIRouter, Depends, HTTPException, status
 
 from login import crud, schemas
 from login.deps import get_session
+from login.responses import ModelResponse
 from login.security import get_current_user
 
 router = APIRouter(tags=["family"])
@@ -40,22 +41,7 @@ def _normalize_gender(value: str | None) -> str | None:
 @router.get("/me/family", response_model=list[schemas.UserFamilyPublic])
 async def list_family(user=Depends(get_current_user), session=Depends(get_session)):
     items = await crud.list_family_members(session, user.id)
-    return [
-        schemas.UserFamilyPublic(
-            id=i.id,
-            user_id=i.user_id,
-            relationship=i.relationship,
-            name=i.name,
-            birth_date=i.birth_date,
-            gender=i.gender,
-            height=i.height,
-            weight=i.weight,
-            allergy=i.allergy,
-            medication=i.medication,
-            updated_at=i.updated_at.isoformat(),
-        )
-        for i in items
-    ]
+    return ModelResponse([schemas.UserFamilyPublic.model_validate(i) for i in items])
 
 
 @router.post("/me/family", response_model=schemas.UserFamilyPublic, status_code=status.HTTP_201_CREATED)
@@ -75,18 +61,8 @@ async def create_family(
         payload.allergy,
         payload.medication,
     )
-    return schemas.UserFamilyPublic(
-        id=member.id,
-        user_id=member.user_id,
-        relationship=member.relationship,
-        name=member.name,
-        birth_date=member.birth_date,
-        gender=member.gender,
-        height=member.height,
-        weight=member.weight,
-        allergy=member.allergy,
-        medication=member.medication,
-        updated_at=member.updated_at.isoformat(),
+    return ModelResponse(
+        schemas.UserFamilyPublic.model_validate(member), status_code=status.HTTP_201_CREATED
     )
 
 
@@ -97,15 +73,13 @@ async def patch_family(
     user=Depends(get_current_user),
     session=Depends(get_session),
 ):
-    member = await crud.get_family_member(session, family_id)
-    if not member or member.user_id != user.id:
-        raise HTTPException(status_code=404, detail="family member not found")
     relationship = None
     if payload.relationship is not None:
         relationship = _normalize_relationship(payload.relationship)
     member = await crud.patch_family_member(
         session,
-        member,
+        user.id,
+        family_id,
         relationship,
         payload.name,
         payload.birth_date,
@@ -115,27 +89,101 @@ async def patch_family(
         payload.allergy,
         payload.medication,
     )
-    return schemas.UserFamilyPublic(
-        id=member.id,
-        user_id=member.user_id,
-        relationship=member.relationship,
-        name=member.name,
-        birth_date=member.birth_date,
-        gender=member.gender,
-        height=member.height,
-        weight=member.weight,
-        allergy=member.allergy,
-        medication=member.medication,
-        updated_at=member.updated_at.isoformat(),
+    if not member:
+        raise HTTPException(status_code=404, detail="family member not found")
+    return ModelResponse(schemas.UserFamilyPublic.model_validate(member))
+
+
+_FAMILY_FIELDS = ("name", "birth_date", "gender", "height", "weight", "allergy", "medication")
+
+
+@router.post("/me/family/batch", response_model=schemas.UserFamilyBatchResponse)
+async def batch_family(
+    payload: schemas.UserFamilyBatchRequest,
+    user=Depends(get_current_user),
+    session=Depends(get_session),
+):
+    # Valid operations are applied together in one transaction (creates, then
+    # patches, then deletes); invalid ones get a per-item 400 and are skipped.
+    # Each id may be patched or deleted once per batch: since the batch is not
+    # applied in list order, later operations on the same id get a 409.
+    results: list[schemas.UserFamilyBatchResult | None] = [None] * len(payload.operations)
+    creates, create_idx = [], []
+    patches, patch_idx = [], []
+    deletes, delete_idx = [], []
+    seen_ids: set[int] = set()
+    for index, item in enumerate(payload.operations):
+        try:
+            if item.op != "create" and item.id is None:
+                raise HTTPException(status_code=400, detail="id required")
+            if item.id in seen_ids:
+                raise HTTPException(status_code=409, detail="id already used in this batch")
+            if item.op == "create":
+                if item.relationship is None:
+                    raise HTTPException(status_code=400, detail="relationship required")
+                values = {f: getattr(item, f) for f in _FAMILY_FIELDS}
+                values["relationship"] = _normalize_relationship(item.relationship)
+                values["gender"] = _normalize_gender(item.gender)
+                creates.append(values)
+                create_idx.append(index)
+            elif item.op == "patch":
+                values = {f: getattr(item, f) for f in _FAMILY_FIELDS if getattr(item, f) is not None}
+                if item.relationship is not None:
+                    values["relationship"] = _normalize_relationship(item.relationship)
+                if item.gender is not None:
+                    values["gender"] = _normalize_gender(item.gender)
+                patches.append((item.id, values))
+                patch_idx.append(index)
+                seen_ids.add(item.id)
+            else:
+                deletes.append(item.id)
+                delete_idx.append(index)
+                seen_ids.add(item.id)
+        except HTTPException as exc:
+            results[index] = schemas.UserFamilyBatchResult(
+                index=index, op=item.op, status=exc.status_code, id=item.id, detail=exc.detail
+            )
+
+    created, patched, deleted = await crud.apply_family_batch(
+        session, user.id, creates, patches, deletes
     )
+    for index, member in zip(create_idx, created):
+        results[index] = schemas.UserFamilyBatchResult(
+            index=index,
+            op="create",
+            status=201,
+            id=member.id,
+            member=schemas.UserFamilyPublic.model_validate(member),
+        )
+    for index, (family_id, _), member in zip(patch_idx, patches, patched):
+        results[index] = (
+            schemas.UserFamilyBatchResult(
+                index=index,
+                op="patch",
+                status=200,
+                id=member.id,
+                member=schemas.UserFamilyPublic.model_validate(member),
+            )
+            if member
+            else schemas.UserFamilyBatchResult(
+                index=index, op="patch", status=404, id=family_id, detail="family member not found"
+            )
+        )
+    for index, family_id in zip(delete_idx, deletes):
+        results[index] = (
+            schemas.UserFamilyBatchResult(index=index, op="delete", status=204, id=family_id)
+            if family_id in deleted
+            else schemas.UserFamilyBatchResult(
+                index=index, op="delete", status=404, id=family_id, detail="family member not found"
+            )
+        )
+    return ModelResponse(schemas.UserFamilyBatchResponse(results=results))
 
 
 @router.delete("/me/family/{family_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_family(
     family_id: int, user=Depends(get_current_user), session=Depends(get_session)
 ):
-    member = await crud.get_family_member(session, family_id)
-    if not member or member.user_id != user.id:
+    if not await crud.delete_family_member(session, user.id, family_id):
         raise HTTPException(status_code=404, detail="family member not found")
-    await crud.delete_family_member(session, member)
     return None
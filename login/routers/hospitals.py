@@ -1,52 +1,145 @@
+import base64
+import binascii
+import json
+from typing import Literal
+
 from fastapi import APIRouter, Depends, HTTPException, Query, status
 
 from login import crud, schemas
+from login.db import CONNECTION_ERRORS
 from login.deps import get_session
+from login.responses import ModelResponse
+from login.snapshot import hospital_snapshot
 
 router = APIRouter(tags=["hospitals"])
 
+# hospitals.id is an INTEGER column
+INT4_MIN, INT4_MAX = -(2**31), 2**31 - 1
+
+
+def _encode_cursor(key: dict) -> str:
+    raw = json.dumps(key, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> dict | None:
+    # An empty cursor starts cursor pagination from the first row.
+    if not cursor:
+        return None
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (ValueError, binascii.Error):
+        raise HTTPException(status_code=400, detail="invalid cursor")
+    if not isinstance(key, dict):
+        raise HTTPException(status_code=400, detail="invalid cursor")
+    hospital_id, pos, rank = key.get("id"), key.get("pos", 0), key.get("rank", 0.0)
+    # the values end up in SQL as INTEGER / REAL; out of range is a client error
+    if (
+        not _is_int(hospital_id)
+        or not INT4_MIN <= hospital_id <= INT4_MAX
+        or not _is_int(pos)
+        or pos < 0
+        or isinstance(rank, bool)
+        or not isinstance(rank, (int, float))
+        or not 0.0 <= rank <= 1.0
+    ):
+        raise HTTPException(status_code=400, detail="invalid cursor")
+    return key
+
+
+def _is_int(value) -> bool:
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+async def _read(call, session, *args):
+    # In snapshot fallback mode a read that could not reach Postgres is retried from the snapshot,
+    # which then keeps serving reads until HOSPITAL_SNAPSHOT_FALLBACK_SEC passes.
+    # Reads the snapshot cannot answer (see login/snapshot.py) get a 503.
+    try:
+        return await call(session, *args)
+    except CONNECTION_ERRORS:
+        if not hospital_snapshot.mark_db_degraded():
+            raise
+    # the failed statement left the session's transaction unusable
+    await session.rollback()
+    try:
+        return await call(session, *args)
+    except CONNECTION_ERRORS:
+        raise HTTPException(
+            status_code=503, detail="hospital data is unavailable", headers={"Retry-After": "5"}
+        )
+
+
+def _hospital_public(hospital) -> schemas.HospitalPublic:
+    return schemas.HospitalPublic.model_validate(hospital)
+
 
 @router.get("/hospitals", response_model=schemas.HospitalList)
 async def list_hospitals(
     q: str | None = Query(default=None),
     page: int = Query(default=1, ge=1),
     size: int = Query(default=20, ge=1, le=100),
+    cursor: str | None = Query(default=None),
+    total: Literal["exact", "estimate", "none"] | None = Query(default=None),
+    lat: float | None = Query(default=None, ge=-90, le=90),
+    lon: float | None = Query(default=None, ge=-180, le=180),
+    open_only: bool = Query(default=False),
     session=Depends(get_session),
 ):
-    items, total = await crud.list_hospitals(session, q, page, size)
-    return schemas.HospitalList(
-        items=[
-            schemas.HospitalPublic(
-                id=i.id,
-                name=i.name,
-                is_open=i.is_open,
-                distance_km=i.distance_km,
-                address=i.address,
-                er_beds=i.er_beds,
-                operating_rooms=i.operating_rooms,
+    q = q.strip() if q else None
+    if lat is not None or lon is not None:
+        if lat is None or lon is None:
+            raise HTTPException(status_code=400, detail="lat and lon must be given together")
+        # Nearest mode: the `size` closest hospitals, distance_km measured from (lat, lon).
+        nearest = await _read(crud.nearest_hospitals, session, lat, lon, size, q, open_only)
+        return ModelResponse(
+            schemas.HospitalList(
+                items=[
+                    _hospital_public(h).model_copy(update={"distance_km": round(d, 3)})
+                    for h, d in nearest
+                ],
+                page=1,
+                size=size,
+                total=len(nearest),
             )
-            for i in items
-        ],
-        page=page,
-        size=size,
-        total=total,
+        )
+    if cursor is not None:
+        # Keyset mode: no OFFSET, and no count(*) unless total=exact.
+        items, next_key, count = await _read(
+            crud.list_hospitals_keyset, session, q, _decode_cursor(cursor), size, total == "exact"
+        )
+        if total == "estimate":
+            count = await _read(crud.estimate_hospital_count, session, q)
+        return ModelResponse(
+            schemas.HospitalList(
+                items=[_hospital_public(i) for i in items],
+                size=size,
+                total=count,
+                next_cursor=_encode_cursor(next_key) if next_key else None,
+            )
+        )
+
+    items, count = await _read(
+        crud.list_hospitals, session, q, page, size, total in (None, "exact")
+    )
+    if total == "estimate":
+        count = await _read(crud.estimate_hospital_count, session, q)
+    return ModelResponse(
+        schemas.HospitalList(
+            items=[_hospital_public(i) for i in items],
+            page=page,
+            size=size,
+            total=count,
+        )
     )
 
 
 @router.get("/hospitals/{hospital_id}", response_model=schemas.HospitalPublic)
 async def get_hospital(hospital_id: int, session=Depends(get_session)):
-    hospital = await crud.get_hospital_by_id(session, hospital_id)
+    hospital = await _read(crud.get_hospital_by_id, session, hospital_id)
     if not hospital:
         raise HTTPException(status_code=404, detail="hospital not found")
-    return schemas.HospitalPublic(
-        id=hospital.id,
-        name=hospital.name,
-        is_open=hospital.is_open,
-        distance_km=hospital.distance_km,
-        address=hospital.address,
-        er_beds=hospital.er_beds,
-        operating_rooms=hospital.operating_rooms,
-    )
+    return ModelResponse(_hospital_public(hospital))
 
 
 @router.api_route("/hospitals", methods=["POST", "PUT", "PATCH", "DELETE"])
@@ -2,6 +2,7 @@ from fastapi import APIRouter, Depends, HTTPException, status
 
 from login import crud, schemas
 from login.deps import get_session
+from login.responses import ModelResponse
 from login.security import get_current_user
 
 router = APIRouter(tags=["profiles"])
@@ -28,17 +29,7 @@ async def get_profile(user=Depends(get_current_user), session=Depends(get_sessio
     profile = await crud.get_profile_by_user_id(session, user.id)
     if not profile:
         raise HTTPException(status_code=404, detail="profile not found")
-    return schemas.UserProfilePublic(
-        user_id=profile.user_id,
-        name=profile.name,
-        birth_date=profile.birth_date,
-        gender=profile.gender,
-        height=profile.height,
-        weight=profile.weight,
-        allergy=profile.allergy,
-        medication=profile.medication,
-        updated_at=profile.updated_at.isoformat(),
-    )
+    return ModelResponse(schemas.UserProfilePublic.model_validate(profile))
 
 
 @router.put("/me/profile", response_model=schemas.UserProfilePublic)
@@ -58,17 +49,7 @@ async def upsert_profile(
         payload.allergy,
         payload.medication,
     )
-    return schemas.UserProfilePublic(
-        user_id=profile.user_id,
-        name=profile.name,
-        birth_date=profile.birth_date,
-        gender=profile.gender,
-        height=profile.height,
-        weight=profile.weight,
-        allergy=profile.allergy,
-        medication=profile.medication,
-        updated_at=profile.updated_at.isoformat(),
-    )
+    return ModelResponse(schemas.UserProfilePublic.model_validate(profile))
 
 
 @router.patch("/me/profile", response_model=schemas.UserProfilePublic)
@@ -77,12 +58,9 @@ async def patch_profile(
     user=Depends(get_current_user),
     session=Depends(get_session),
 ):
-    profile = await crud.get_profile_by_user_id(session, user.id)
-    if not profile:
-        raise HTTPException(status_code=404, detail="profile not found")
     profile = await crud.patch_profile(
         session,
-        profile,
+        user.id,
         payload.name,
         payload.birth_date,
         _normalize_gender(payload.gender),
@@ -91,23 +69,13 @@ async def patch_profile(
         payload.allergy,
         payload.medication,
     )
-    return schemas.UserProfilePublic(
-        user_id=profile.user_id,
-        name=profile.name,
-        birth_date=profile.birth_date,
-        gender=profile.gender,
-        height=profile.height,
-        weight=profile.weight,
-        allergy=profile.allergy,
-        medication=profile.medication,
-        updated_at=profile.updated_at.isoformat(),
-    )
+    if not profile:
+        raise HTTPException(status_code=404, detail="profile not found")
+    return ModelResponse(schemas.UserProfilePublic.model_validate(profile))
 
 
 @router.delete("/me/profile", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_profile(user=Depends(get_current_user), session=Depends(get_session)):
-    profile = await crud.get_profile_by_user_id(session, user.id)
-    if not profile:
+    if not await crud.delete_profile(session, user.id):
         raise HTTPException(status_code=404, detail="profile not found")
-    await crud.delete_profile(session, profile)
     return None
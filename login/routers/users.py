@@ -1,57 +1,73 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+import hashlib
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Response, status
 
 from login import crud, schemas
 from login.deps import get_session
-from login.security import get_current_user
+from login.responses import ModelResponse
+from login.security import get_current_user, get_current_user_record
 
 router = APIRouter(tags=["users"])
 
 
 @router.get("/me", response_model=schemas.UserPublic)
-async def me(user=Depends(get_current_user), session=Depends(get_session)):
-    db_user = await crud.get_user_by_id(session, user.id)
+async def me(user=Depends(get_current_user_record)):
+    # the principal is the DB row or its cached copy (invalidated on writes)
+    return ModelResponse(user)
+
+
+def _etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [c.strip().removeprefix("W/") for c in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+@router.get("/me/home", response_model=schemas.UserHome)
+async def home(
+    user=Depends(get_current_user),
+    session=Depends(get_session),
+    if_none_match: str | None = Header(default=None),
+):
+    # /me, /me/profile and /me/family for the app's first screen, from one query
+    db_user = await crud.get_user_home(session, user.id)
     if not db_user:
-        raise HTTPException(status_code=404, detail="user not found")
-    return schemas.UserPublic(
-        id=db_user.id,
-        email=db_user.email,
-        created_at=db_user.created_at.isoformat(),
-        updated_at=db_user.updated_at.isoformat(),
-    )
+        raise HTTPException(status_code=401, detail="user not found")
+    profile = db_user.profile
+    body = schemas.UserHome(
+        user=schemas.UserPublic.model_validate(db_user),
+        profile=schemas.UserProfilePublic.model_validate(profile) if profile else None,
+        family=[schemas.UserFamilyPublic.model_validate(i) for i in db_user.family_members],
+    ).model_dump_json().encode()
+    etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if _etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
 
 
 @router.patch("/me", response_model=schemas.UserPublic)
 async def update_me(
     payload: schemas.UserUpdate, user=Depends(get_current_user), session=Depends(get_session)
 ):
-    db_user = await crud.get_user_by_id(session, user.id)
-    if not db_user:
+    updated = await crud.update_user(session, user.id, **payload.model_dump(exclude_unset=True))
+    if not updated:
         raise HTTPException(status_code=404, detail="user not found")
-    updated = await crud.update_user(session, db_user)
-    return schemas.UserPublic(
-        id=updated.id,
-        email=updated.email,
-        created_at=updated.created_at.isoformat(),
-        updated_at=updated.updated_at.isoformat(),
-    )
+    return ModelResponse(schemas.UserPublic.model_validate(updated))
 
 
 @router.delete("/me", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_me(user=Depends(get_current_user), session=Depends(get_session)):
-    db_user = await crud.get_user_by_id(session, user.id)
-    if not db_user:
+    if not await crud.delete_user(session, user.id):
         raise HTTPException(status_code=404, detail="user not found")
-    await crud.delete_user(session, db_user)
     return None
 
 
 @router.get("/users/{user_id}", response_model=schemas.UserPublic)
-async def get_user_by_id(
-    user_id: int, user=Depends(get_current_user), session=Depends(get_session)
-):
+async def get_user_by_id(user_id: int, user=Depends(get_current_user_record)):
     if user_id != user.id:
         raise HTTPException(status_code=403, detail="forbidden")
-    return await me(user, session)
+    return await me(user)
 
 
 @router.patch("/users/{user_id}", response_model=schemas.UserPublic)
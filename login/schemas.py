@@ -1,11 +1,30 @@
-from pydantic import BaseModel
+from datetime import datetime
+from typing import Annotated, Literal
+
+from pydantic import BaseModel, BeforeValidator, ConfigDict, Field
+
+
+def _isoformat(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+# DB timestamps are sent as isoformat() strings
+Timestamp = Annotated[str | None, BeforeValidator(_isoformat)]
+
+# ids that are looked up in numpy int64 columns (ranking.HospitalColumns)
+Int64 = Annotated[int, Field(ge=-(2**63), le=2**63 - 1)]
+
+# ids that are written to an int4 column (hospitals.id)
+Int32 = Annotated[int, Field(ge=-(2**31), le=2**31 - 1)]
 
 
 class UserPublic(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
     id: int
     email: str
-    created_at: str | None = None
-    updated_at: str | None = None
+    created_at: Timestamp = None
+    updated_at: Timestamp = None
 
 
 class UserCreate(BaseModel):
@@ -34,6 +53,8 @@ class UserUpdate(BaseModel):
 
 
 class UserProfilePublic(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
     user_id: int
     name: str | None = None
     birth_date: str | None = None
@@ -42,7 +63,7 @@ class UserProfilePublic(BaseModel):
     weight: float | None = None
     allergy: dict | None = None
     medication: dict | None = None
-    updated_at: str | None = None
+    updated_at: Timestamp = None
 
 
 class UserProfileUpsert(BaseModel):
@@ -66,27 +87,83 @@ class UserProfilePatch(BaseModel):
 
 
 class HospitalPublic(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
     id: int
     name: str
     is_open: bool
     distance_km: float | None = None
     address: str | None = None
+    latitude: float | None = None
+    longitude: float | None = None
     er_beds: int | None = None
     operating_rooms: int | None = None
 
 
 class HospitalList(BaseModel):
     items: list[HospitalPublic]
-    page: int
+    page: int | None = None
     size: int
-    total: int
+    total: int | None = None
+    next_cursor: str | None = None
+
+
+class BedUpdate(BaseModel):
+    # omitted fields keep their current value
+    hospital_id: Int32
+    is_open: bool | None = None
+    er_beds: int | None = Field(default=None, ge=0)
+    operating_rooms: int | None = Field(default=None, ge=0)
+
+
+class BedUpdateBatch(BaseModel):
+    updates: list[BedUpdate] = Field(min_length=1, max_length=1000)
+
+
+class BedStatus(BaseModel):
+    hospital_id: int
+    is_open: bool
+    er_beds: int | None = None
+    operating_rooms: int | None = None
+
+
+class BedUpdateResult(BaseModel):
+    received: int
+    changed: list[BedStatus]
 
 
 class AutoCallTriggerRequest(BaseModel):
-    hospital_ids: list[int]
+    hospital_ids: list[Int64]
+    latitude: float | None = Field(default=None, ge=-90, le=90)
+    longitude: float | None = Field(default=None, ge=-180, le=180)
+    limit: int | None = Field(default=None, ge=1, le=100)
+
+
+class AutoCallTarget(BaseModel):
+    hospital_id: int
+    score: float
+    distance_km: float | None = None
+
+
+class AutoCallAttempt(BaseModel):
+    hospital_id: int
+    status: str
+    started_at: str | None = None
+    finished_at: str | None = None
+
+
+class AutoCallJobStatus(BaseModel):
+    job_id: str
+    status: str
+    accepted_hospital_id: int | None = None
+    attempts: list[AutoCallAttempt]
+    created_at: str
+    finished_at: str | None = None
 
 
 class UserFamilyPublic(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
     id: int
     user_id: int
     relationship: str
@@ -97,7 +174,7 @@ class UserFamilyPublic(BaseModel):
     weight: float | None = None
     allergy: dict | None = None
     medication: dict | None = None
-    updated_at: str | None = None
+    updated_at: Timestamp = None
 
 
 class UserFamilyCreate(BaseModel):
@@ -120,3 +197,32 @@ class UserFamilyPatch(BaseModel):
     weight: float | None = None
     allergy: dict | None = None
     medication: dict | None = None
+
+
+class UserFamilyBatchOperation(UserFamilyPatch):
+    op: Literal["create", "patch", "delete"]
+    # required for patch/delete
+    id: int | None = None
+
+
+class UserFamilyBatchRequest(BaseModel):
+    operations: list[UserFamilyBatchOperation] = Field(min_length=1, max_length=50)
+
+
+class UserFamilyBatchResult(BaseModel):
+    index: int
+    op: str
+    status: int
+    id: int | None = None
+    member: UserFamilyPublic | None = None
+    detail: str | None = None
+
+
+class UserFamilyBatchResponse(BaseModel):
+    results: list[UserFamilyBatchResult]
+
+
+class UserHome(BaseModel):
+    user: UserPublic
+    profile: UserProfilePublic | None = None
+    family: list[UserFamilyPublic] = []
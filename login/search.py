@@ -0,0 +1,201 @@
+"""
+Hospital name search.
+
+Backends (HOSPITAL_SEARCH_BACKEND):
+- "memory": in-process n-gram inverted index rebuilt from the hospitals table
+- "pg_trgm": ILIKE served by a GIN trigram index, ranked by similarity()
+  (requires login/migrations/001_hospitals_name_trgm.sql)
+- "like": the original unindexed ILIKE scan
+"""
+import os
+import unicodedata
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from login import db
+from login.cache import RefreshingIndex, TTLCache
+from login.models import Hospital
+
+HOSPITAL_SEARCH_BACKEND = os.getenv("HOSPITAL_SEARCH_BACKEND", "memory")
+HOSPITAL_SEARCH_REFRESH_SEC = float(os.getenv("HOSPITAL_SEARCH_REFRESH_SEC", "300"))
+SEARCH_RESULT_CACHE_SIZE = int(os.getenv("SEARCH_RESULT_CACHE_SIZE", "256"))
+FUZZY_MIN_SIMILARITY = 0.5
+
+_HANGUL_BASE = 0xAC00
+_HANGUL_LAST = 0xD7A3
+_CHOSUNG = "ㄱㄲㄴㄷㄸㄹㅁㅂㅃㅅㅆㅇㅈㅉㅊㅋㅌㅍㅎ"
+_CHOSUNG_SET = frozenset(_CHOSUNG)
+# NFKC turns compatibility jamo (ㄱ, U+3131) into conjoining jamo (U+1100);
+# fold the initial consonants back so chosung queries survive normalization.
+_CONJOINING_TO_CHOSUNG = {0x1100 + i: ch for i, ch in enumerate(_CHOSUNG)}
+
+
+def normalize(text: str) -> str:
+    # NFKC folds full-width/compatibility forms; whitespace and punctuation are
+    # dropped so "삼성 병원" and "삼성병원" index the same way.
+    text = unicodedata.normalize("NFKC", text).casefold().translate(_CONJOINING_TO_CHOSUNG)
+    return "".join(ch for ch in text if ch.isalnum())
+
+
+def to_chosung(text: str) -> str:
+    out = []
+    for ch in text:
+        code = ord(ch)
+        if _HANGUL_BASE <= code <= _HANGUL_LAST:
+            out.append(_CHOSUNG[(code - _HANGUL_BASE) // 588])
+        else:
+            out.append(ch)
+    return "".join(out)
+
+
+def is_chosung_query(term: str) -> bool:
+    return bool(term) and all(ch in _CHOSUNG_SET for ch in term)
+
+
+def ngrams(text: str) -> set[str]:
+    # Hangul syllables carry a lot of information each, so character bigrams
+    # (plus unigrams for one-character queries) work well for Korean names.
+    grams = set(text)
+    grams.update(text[i : i + 2] for i in range(len(text) - 1))
+    return grams
+
+
+def query_terms(q: str) -> list[str]:
+    terms = [normalize(t) for t in unicodedata.normalize("NFKC", q).split()]
+    return [t for t in terms if t]
+
+
+def _query_grams(term: str) -> set[str]:
+    if len(term) == 1:
+        return {term}
+    return {term[i : i + 2] for i in range(len(term) - 1)}
+
+
+class HospitalSearchIndex:
+    def __init__(self) -> None:
+        self.names: dict[int, str] = {}
+        self.compact: dict[int, str] = {}
+        self.chosung: dict[int, str] = {}
+        self.postings: dict[str, list[int]] = {}
+        self.chosung_postings: dict[str, list[int]] = {}
+        # normalized query -> ranked ids; dies with the index on rebuild
+        self._results = TTLCache(maxsize=SEARCH_RESULT_CACHE_SIZE, ttl=HOSPITAL_SEARCH_REFRESH_SEC)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    @classmethod
+    def build(cls, rows) -> "HospitalSearchIndex":
+        index = cls()
+        for hospital_id, name in sorted(rows):
+            compact = normalize(name)
+            chosung = to_chosung(compact)
+            index.names[hospital_id] = name
+            index.compact[hospital_id] = compact
+            index.chosung[hospital_id] = chosung
+            for gram in ngrams(compact):
+                index.postings.setdefault(gram, []).append(hospital_id)
+            for gram in ngrams(chosung):
+                index.chosung_postings.setdefault(gram, []).append(hospital_id)
+        return index
+
+    def _candidates(self, term: str) -> set[int]:
+        if is_chosung_query(term):
+            postings, docs = self.chosung_postings, self.chosung
+        else:
+            postings, docs = self.postings, self.compact
+        lists = sorted((postings.get(g, ()) for g in _query_grams(term)), key=len)
+        if not lists or not lists[0]:
+            return set()
+        found = set(lists[0])
+        for other in lists[1:]:
+            found.intersection_update(other)
+            if not found:
+                break
+        # bigram intersection can over-match, so confirm the substring
+        return {i for i in found if term in docs[i]}
+
+    def _rank_key(self, terms: list[str]):
+        fields = [(t, self.chosung if is_chosung_query(t) else self.compact) for t in terms]
+        names = self.names
+
+        def key(hospital_id: int) -> tuple[float, int, int]:
+            score = 0.0
+            for term, docs in fields:
+                text = docs[hospital_id]
+                if text == term:
+                    score += 100
+                elif text.startswith(term):
+                    score += 50
+                else:
+                    score += 20 - min(10, text.find(term))
+                score += 10 * len(term) / len(text)
+            return -score, len(names[hospital_id]), hospital_id
+
+        return key
+
+    def _fuzzy(self, terms: list[str]) -> list[tuple[float, int]]:
+        grams = set().union(*(_query_grams(t) for t in terms if not is_chosung_query(t)))
+        if not grams:
+            return []
+        shared: dict[int, int] = {}
+        for gram in grams:
+            for hospital_id in self.postings.get(gram, ()):
+                shared[hospital_id] = shared.get(hospital_id, 0) + 1
+        hits = []
+        for hospital_id, count in shared.items():
+            doc_grams = max(1, len(self.compact[hospital_id]) - 1)
+            similarity = 2 * count / (len(grams) + doc_grams)
+            if similarity >= FUZZY_MIN_SIMILARITY:
+                hits.append((similarity, hospital_id))
+        return hits
+
+    def search(self, q: str) -> list[int]:
+        """Return matching hospital ids, best match first."""
+        terms = query_terms(q)
+        if not terms:
+            return []
+        cache_key = " ".join(terms)
+        cached = self._results.get(cache_key)
+        if cached is not None:
+            return cached
+
+        matched: set[int] | None = None
+        for term in terms:
+            found = self._candidates(term)
+            matched = found if matched is None else matched & found
+            if not matched:
+                break
+        if matched:
+            ids = sorted(matched, key=self._rank_key(terms))
+        else:
+            hits = self._fuzzy(terms)
+            hits.sort(key=lambda hit: (-hit[0], len(self.names[hit[1]]), hit[1]))
+            ids = [hospital_id for _similarity, hospital_id in hits]
+        self._results.set(cache_key, ids)
+        return ids
+
+
+class HospitalSearch(RefreshingIndex):
+    async def load(self, session: AsyncSession) -> list[tuple[int, str]]:
+        result = await session.execute(select(Hospital.id, Hospital.name))
+        return [tuple(row) for row in result.all()]
+
+    def build(self, rows: list[tuple[int, str]]) -> HospitalSearchIndex:
+        return HospitalSearchIndex.build(rows)
+
+    def patch(self, index: HospitalSearchIndex, changes) -> None:
+        # only names are indexed, and nothing patches them in place
+        pass
+
+    def stats(self) -> dict:
+        return {
+            "backend": HOSPITAL_SEARCH_BACKEND,
+            "documents": len(self.index) if self.index else 0,
+            "grams": len(self.index.postings) if self.index else 0,
+            "rebuilds": self.rebuilds,
+        }
+
+
+hospital_search = HospitalSearch(refresh_sec=HOSPITAL_SEARCH_REFRESH_SEC, session_factory=db.async_session)
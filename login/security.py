@@ -7,12 +7,20 @@ from jose import JWTError, jwt
 from passlib.context import CryptContext
 
 from login import crud, schemas
+from login.auth_cache import principal_cache, revocations, session_gens
 from login.deps import get_session
+from login.hashing import HashingService, HashQueueFull
 
 SECRET_KEY = os.getenv("SECRET_KEY", "CHANGE_THIS_SECRET")
 ALGORITHM = "HS256"
 ACCESS_EXPIRE_MIN = int(os.getenv("ACCESS_EXPIRE_MIN", "30"))
 REFRESH_EXPIRE_DAYS = int(os.getenv("REFRESH_EXPIRE_DAYS", "7"))
+# "db": look the user up on every request; "stateless": trust the token claims
+# unless the user has been flagged in the in-process revocation list.
+AUTH_MODE = os.getenv("AUTH_MODE", "db")
+HASH_EXECUTOR = os.getenv("HASH_EXECUTOR", "thread")
+HASH_WORKERS = int(os.getenv("HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+HASH_QUEUE_MAX = int(os.getenv("HASH_QUEUE_MAX", "64"))
 
 pwd_ctx = CryptContext(schemes=["argon2"], deprecated="auto")
 security = HTTPBearer()
@@ -26,21 +34,111 @@ def verify_password(password: str, hashed: str) -> bool:
     return pwd_ctx.verify(password, hashed)
 
 
-def create_access_token(user_id: int) -> str:
-    expire = datetime.utcnow() + timedelta(minutes=ACCESS_EXPIRE_MIN)
-    payload = {"sub": str(user_id), "exp": expire}
+hasher = HashingService(
+    hash_password,
+    verify_password,
+    workers=HASH_WORKERS,
+    max_queue=HASH_QUEUE_MAX,
+    executor=HASH_EXECUTOR,
+)
+
+
+async def hash_password_async(password: str) -> str:
+    try:
+        return await hasher.hash(password)
+    except HashQueueFull:
+        raise HTTPException(status_code=503, detail="server busy", headers={"Retry-After": "1"})
+
+
+async def verify_password_async(password: str, hashed: str) -> bool:
+    try:
+        return await hasher.verify(password, hashed)
+    except HashQueueFull:
+        raise HTTPException(status_code=503, detail="server busy", headers={"Retry-After": "1"})
+
+
+def create_access_token(user) -> str:
+    now = datetime.utcnow()
+    payload = {
+        "sub": str(user.id),
+        "iat": now,
+        "exp": now + timedelta(minutes=ACCESS_EXPIRE_MIN),
+        "email": user.email,
+        "created_at": user.created_at.isoformat(),
+        "updated_at": user.updated_at.isoformat(),
+        "gen": user.session_gen,
+    }
     return jwt.encode(payload, SECRET_KEY, algorithm=ALGORITHM)
 
 
-async def get_current_user(token=Depends(security), session=Depends(get_session)) -> schemas.UserPublic:
+def _principal_from_claims(payload: dict) -> schemas.UserPublic | None:
+    if AUTH_MODE != "stateless" or "email" not in payload:
+        return None
+    user_id = int(payload["sub"])
+    if revocations.is_suspect(user_id, payload.get("iat")):
+        return None
+    return schemas.UserPublic(
+        id=user_id,
+        email=payload["email"],
+        created_at=payload.get("created_at"),
+        updated_at=payload.get("updated_at"),
+    )
+
+
+def _decode_access_token(credentials: str) -> dict:
     try:
-        payload = jwt.decode(token.credentials, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id = payload.get("sub")
-        if not user_id:
-            raise HTTPException(status_code=401, detail="invalid token")
-        user = await crud.get_user_by_id(session, int(user_id))
-        if not user:
-            raise HTTPException(status_code=401, detail="user not found")
-        return schemas.UserPublic(id=user.id, email=user.email)
+        payload = jwt.decode(credentials, SECRET_KEY, algorithms=[ALGORITHM])
     except JWTError:
         raise HTTPException(status_code=401, detail="invalid token")
+    if not payload.get("sub"):
+        raise HTTPException(status_code=401, detail="invalid token")
+    return payload
+
+
+def _principal_from_user(user) -> schemas.UserPublic:
+    return schemas.UserPublic.model_validate(user)
+
+
+def _check_session_gen(payload: dict, current_gen: int) -> None:
+    if payload.get("gen", 0) < current_gen:
+        raise HTTPException(status_code=401, detail="session revoked")
+
+
+async def _authenticate(token, session, trust_claims: bool) -> schemas.UserPublic:
+    payload = _decode_access_token(token.credentials)
+    user_id = int(payload["sub"])
+    claims = _principal_from_claims(payload) if trust_claims else None
+    # the generation check rides on the same cache/DB read as the principal,
+    # so it costs no extra query
+    current_gen = session_gens.get(user_id)
+    if current_gen is not None:
+        _check_session_gen(payload, current_gen)
+    if claims:
+        # Stateless: the token's gen is trusted as well. bump_session_gen marks
+        # the user in the revocation list, which sends older tokens to the DB
+        # check below, so an expired session_gens entry needs no query.
+        return claims
+    if current_gen is not None and (principal := principal_cache.get(user_id)):
+        return principal
+    user = await crud.get_user_by_id(session, user_id)
+    if not user:
+        raise HTTPException(status_code=401, detail="user not found")
+    session_gens.set(user.id, user.session_gen)
+    _check_session_gen(payload, user.session_gen)
+    # only DB-backed principals are cached; routes that return the user read
+    # the cache and must not get claims frozen at token issue time
+    principal = _principal_from_user(user)
+    principal_cache.set(user.id, principal)
+    return principal
+
+
+async def get_current_user(token=Depends(security), session=Depends(get_session)) -> schemas.UserPublic:
+    return await _authenticate(token, session, trust_claims=True)
+
+
+async def get_current_user_record(
+    token=Depends(security), session=Depends(get_session)
+) -> schemas.UserPublic:
+    """Like get_current_user, but never built from token claims, whose
+    updated_at is frozen at issue time. For routes that return the user."""
+    return await _authenticate(token, session, trust_claims=False)
@@ -0,0 +1,364 @@
+"""
+Memory-mapped, read-only snapshot of the hospitals table.
+
+The builder writes every hospital to one binary file: fixed-width NumPy
+columns (sorted by id) plus a UTF-8 heap for names and addresses. Each worker
+mmaps the file, so all workers on a host share one page-cached copy, and the
+hospital reads in crud serve lookups, pages and by-id fetches from it without
+touching Postgres.
+
+The file is written next to its final path and moved into place with
+os.replace. Workers stat it at most every HOSPITAL_SNAPSHOT_CHECK_SEC (and
+right away after a hospitals_reloaded notification) and swap in the new
+mapping when the inode changes; requests holding the old one finish on it.
+
+HOSPITAL_SNAPSHOT_MODE:
+- "primary": hospital reads come from the snapshot whenever it is loaded
+- "fallback": reads go to Postgres; after a DB error the snapshot serves them
+  for HOSPITAL_SNAPSHOT_FALLBACK_SEC before Postgres is tried again
+- "off": the snapshot is not used
+
+The file only changes on a rebuild, but is_open, er_beds and operating_rooms
+change through the bed feed, so crud takes those three fields from the
+ranking columns (login/ranking.py): the feed patches them in place and every
+worker reloads them each HOSPITAL_RANKING_REFRESH_SEC, which is the one
+periodic query primary mode still makes.
+
+While Postgres is marked degraded in fallback mode, name searches are answered
+by a case-insensitive substring match over the snapshot's names, in id order.
+Reads that need an in-memory index that was never built, or the earthdistance
+backend, still need Postgres and fail until it is back.
+
+    python -m login.snapshot [--path PATH]
+"""
+import argparse
+import asyncio
+import mmap
+import os
+import struct
+import time
+from collections import namedtuple
+
+import numpy as np
+from dotenv import load_dotenv
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+if __name__ == "__main__":
+    # as a script, load .env before db/config read it (app.py does the same)
+    load_dotenv(override=True)
+
+from login import db
+from login.models import Hospital
+
+HOSPITAL_SNAPSHOT_PATH = os.getenv("HOSPITAL_SNAPSHOT_PATH", "")
+HOSPITAL_SNAPSHOT_MODE = os.getenv("HOSPITAL_SNAPSHOT_MODE", "primary")
+HOSPITAL_SNAPSHOT_CHECK_SEC = float(os.getenv("HOSPITAL_SNAPSHOT_CHECK_SEC", "5"))
+HOSPITAL_SNAPSHOT_FALLBACK_SEC = float(os.getenv("HOSPITAL_SNAPSHOT_FALLBACK_SEC", "30"))
+
+# same fields, in the same order, as crud.HOSPITAL_COLUMNS
+SnapshotHospital = namedtuple(
+    "SnapshotHospital",
+    "id name is_open distance_km address latitude longitude er_beds operating_rooms",
+)
+
+MAGIC = b"HSNP"
+VERSION = 1
+# magic, version, rows, heap bytes, built_at (unix time the rows were read)
+HEADER = struct.Struct("<4sIQQd")
+# (name, dtype, rows + extra); NULL is NaN for floats and -1 for counts
+SECTIONS = (
+    ("id", "<i8", 0),
+    ("distance_km", "<f8", 0),
+    ("latitude", "<f8", 0),
+    ("longitude", "<f8", 0),
+    ("name_off", "<u8", 1),
+    ("address_off", "<u8", 1),
+    ("er_beds", "<i4", 0),
+    ("operating_rooms", "<i4", 0),
+    ("is_open", "u1", 0),
+    ("address_null", "u1", 0),
+)
+
+
+class SnapshotError(Exception):
+    pass
+
+
+def _layout(rows: int) -> tuple[dict[str, tuple[np.dtype, int, int]], int]:
+    """Section name -> (dtype, offset, count), and the heap offset."""
+    layout = {}
+    offset = HEADER.size
+    for name, dtype, extra in SECTIONS:
+        dtype = np.dtype(dtype)
+        offset += -offset % 8
+        layout[name] = (dtype, offset, rows + extra)
+        offset += dtype.itemsize * (rows + extra)
+    return layout, offset
+
+
+def _heap(values: list[str | None]) -> tuple[bytes, np.ndarray]:
+    encoded = [(v or "").encode("utf-8") for v in values]
+    offsets = np.zeros(len(encoded) + 1, dtype="<u8")
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    return b"".join(encoded), offsets
+
+
+def write_snapshot(rows: list[tuple], path: str, built_at: float) -> int:
+    """Write ``rows`` (SnapshotHospital field order) to ``path`` atomically."""
+    rows = sorted(rows, key=lambda r: r[0])
+    names, name_off = _heap([r[1] for r in rows])
+    addresses, address_off = _heap([r[4] for r in rows])
+    address_off += len(names)
+    columns = {
+        "id": np.array([r[0] for r in rows], dtype="<i8"),
+        "distance_km": np.array([np.nan if r[3] is None else r[3] for r in rows], dtype="<f8"),
+        "latitude": np.array([np.nan if r[5] is None else r[5] for r in rows], dtype="<f8"),
+        "longitude": np.array([np.nan if r[6] is None else r[6] for r in rows], dtype="<f8"),
+        "name_off": name_off,
+        "address_off": address_off,
+        "er_beds": np.array([-1 if r[7] is None else r[7] for r in rows], dtype="<i4"),
+        "operating_rooms": np.array([-1 if r[8] is None else r[8] for r in rows], dtype="<i4"),
+        "is_open": np.array([bool(r[2]) for r in rows], dtype="u1"),
+        "address_null": np.array([r[4] is None for r in rows], dtype="u1"),
+    }
+    layout, heap_offset = _layout(len(rows))
+    tmp = f"{path}.tmp{os.getpid()}"
+    try:
+        with open(tmp, "wb") as f:
+            f.write(HEADER.pack(MAGIC, VERSION, len(rows), len(names) + len(addresses), built_at))
+            for name, (_dtype, offset, _count) in layout.items():
+                f.write(b"\0" * (offset - f.tell()))
+                f.write(columns[name].tobytes())
+            f.write(b"\0" * (heap_offset - f.tell()))
+            f.write(names)
+            f.write(addresses)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+    return len(rows)
+
+
+class HospitalSnapshot:
+    """Read-only view of a snapshot file; the arrays point into the mapping."""
+
+    def __init__(self, path: str) -> None:
+        with open(path, "rb") as f:
+            self.stat = os.fstat(f.fileno())
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mm.size() < HEADER.size:
+            raise SnapshotError(f"{path} is truncated")
+        magic, version, rows, heap_bytes, self.built_at = HEADER.unpack_from(self._mm)
+        if magic != MAGIC or version != VERSION:
+            raise SnapshotError(f"{path} is not a version {VERSION} hospital snapshot")
+        layout, self._heap = _layout(rows)
+        if self._mm.size() != self._heap + heap_bytes:
+            raise SnapshotError(f"{path} is truncated")
+        for name, (dtype, offset, count) in layout.items():
+            setattr(self, name, np.frombuffer(self._mm, dtype=dtype, count=count, offset=offset))
+        self.path = path
+        self._folded_names: list[str] | None = None
+
+    def __len__(self) -> int:
+        return len(self.id)
+
+    def _text(self, offsets: np.ndarray, i: int) -> str:
+        start, end = int(offsets[i]), int(offsets[i + 1])
+        return self._mm[self._heap + start : self._heap + end].decode("utf-8")
+
+    def rows(self, positions) -> list[SnapshotHospital]:
+        pos = np.asarray(positions, dtype=np.int64)
+        numeric = zip(
+            self.id[pos].tolist(),
+            self.is_open[pos].tolist(),
+            self.distance_km[pos].tolist(),
+            self.latitude[pos].tolist(),
+            self.longitude[pos].tolist(),
+            self.er_beds[pos].tolist(),
+            self.operating_rooms[pos].tolist(),
+            self.address_null[pos].tolist(),
+        )
+        out = []
+        for i, (hid, is_open, dist, lat, lon, beds, rooms, no_address) in zip(
+            pos.tolist(), numeric
+        ):
+            out.append(
+                SnapshotHospital(
+                    id=hid,
+                    name=self._text(self.name_off, i),
+                    is_open=bool(is_open),
+                    distance_km=None if dist != dist else dist,
+                    address=None if no_address else self._text(self.address_off, i),
+                    latitude=None if lat != lat else lat,
+                    longitude=None if lon != lon else lon,
+                    er_beds=None if beds < 0 else beds,
+                    operating_rooms=None if rooms < 0 else rooms,
+                )
+            )
+        return out
+
+    def get(self, hospital_id: int) -> SnapshotHospital | None:
+        pos = int(np.searchsorted(self.id, hospital_id))
+        if pos < len(self.id) and self.id[pos] == hospital_id:
+            return self.rows([pos])[0]
+        return None
+
+    def page(self, offset: int, size: int) -> list[SnapshotHospital]:
+        """Rows in id order, like ORDER BY id OFFSET/LIMIT."""
+        return self.rows(range(min(offset, len(self)), min(offset + size, len(self))))
+
+    def after(self, hospital_id: int | None, size: int) -> list[SnapshotHospital]:
+        """Up to ``size`` rows with id > ``hospital_id``, in id order."""
+        start = 0 if hospital_id is None else int(np.searchsorted(self.id, hospital_id, "right"))
+        return self.rows(range(start, min(start + size, len(self))))
+
+    def by_ids(self, hospital_ids: list[int]) -> list[SnapshotHospital]:
+        """Rows in the caller's order; unknown ids drop out."""
+        if not hospital_ids:
+            return []
+        wanted = np.asarray(hospital_ids, dtype=np.int64)
+        pos = np.searchsorted(self.id, wanted)
+        found = pos < len(self.id)
+        found[found] = self.id[pos[found]] == wanted[found]
+        return self.rows(pos[found])
+
+    def search(self, q: str) -> list[int]:
+        """Ids whose name contains ``q`` (case-insensitive), in id order."""
+        if self._folded_names is None:
+            # decoded on first use; only degraded-mode searches need it
+            self._folded_names = [self._text(self.name_off, i).lower() for i in range(len(self))]
+        q = q.lower()
+        ids = self.id.tolist()
+        return [ids[i] for i, name in enumerate(self._folded_names) if q in name]
+
+
+class SnapshotStore:
+    """The current snapshot of one process, swapped when the file is replaced."""
+
+    def __init__(self, path: str, mode: str, check_sec: float, fallback_sec: float) -> None:
+        self.path = path
+        self.mode = mode if path else "off"
+        self.check_sec = check_sec
+        self.fallback_sec = fallback_sec
+        self.snapshot: HospitalSnapshot | None = None
+        self.swaps = 0
+        self.load_errors = 0
+        self.fallback_reads = 0
+        self.db_degraded_until = 0.0
+        self._checked_at = 0.0
+
+    def invalidate(self) -> None:
+        # stat the file on the next read instead of waiting for check_sec
+        self._checked_at = 0.0
+
+    def current(self) -> HospitalSnapshot | None:
+        if self.mode == "off":
+            return None
+        now = time.monotonic()
+        if now - self._checked_at >= self.check_sec:
+            self._checked_at = now
+            self._reload_if_changed()
+        return self.snapshot
+
+    def _reload_if_changed(self) -> None:
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return  # not built yet, or being replaced: keep the current mapping
+        old = self.snapshot
+        if old is not None and (st.st_ino, st.st_mtime_ns) == (
+            old.stat.st_ino,
+            old.stat.st_mtime_ns,
+        ):
+            return
+        try:
+            snapshot = HospitalSnapshot(self.path)
+        except (OSError, ValueError, SnapshotError):
+            self.load_errors += 1
+            return
+        # the old mapping is closed once the last request using it lets go
+        self.snapshot = snapshot
+        self.swaps += 1
+
+    def for_reads(self) -> HospitalSnapshot | None:
+        """The snapshot to serve hospital reads from, or None to use Postgres."""
+        if self.mode == "primary":
+            return self.current()
+        if self.mode == "fallback" and time.monotonic() < self.db_degraded_until:
+            snapshot = self.current()
+            if snapshot is not None:
+                self.fallback_reads += 1
+            return snapshot
+        return None
+
+    def db_degraded(self) -> bool:
+        return self.mode == "fallback" and time.monotonic() < self.db_degraded_until
+
+    def mark_db_degraded(self) -> bool:
+        """Serve from the snapshot for a while; False when there is none to serve."""
+        if self.mode != "fallback" or self.current() is None:
+            return False
+        self.db_degraded_until = time.monotonic() + self.fallback_sec
+        return True
+
+    def stats(self) -> dict:
+        snapshot = self.snapshot
+        return {
+            "mode": self.mode,
+            "rows": len(snapshot) if snapshot is not None else 0,
+            "built_at": snapshot.built_at if snapshot is not None else None,
+            "swaps": self.swaps,
+            "load_errors": self.load_errors,
+            "fallback_reads": self.fallback_reads,
+        }
+
+
+hospital_snapshot = SnapshotStore(
+    path=HOSPITAL_SNAPSHOT_PATH,
+    mode=HOSPITAL_SNAPSHOT_MODE,
+    check_sec=HOSPITAL_SNAPSHOT_CHECK_SEC,
+    fallback_sec=HOSPITAL_SNAPSHOT_FALLBACK_SEC,
+)
+
+
+async def build_snapshot(session: AsyncSession, path: str) -> dict:
+    started = time.time()
+    result = await session.execute(
+        select(
+            Hospital.id,
+            Hospital.name,
+            Hospital.is_open,
+            Hospital.distance_km,
+            Hospital.address,
+            Hospital.latitude,
+            Hospital.longitude,
+            Hospital.er_beds,
+            Hospital.operating_rooms,
+        )
+    )
+    rows = [tuple(r) for r in result.all()]
+    count = await asyncio.to_thread(write_snapshot, rows, path, started)
+    return {
+        "rows": count,
+        "bytes": os.path.getsize(path),
+        "seconds": round(time.time() - started, 3),
+    }
+
+
+async def _main(path: str) -> None:
+    async with db.async_session() as session:
+        report = await build_snapshot(session, path)
+    await db.engine.dispose()
+    print(report)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write the hospitals snapshot file.")
+    parser.add_argument("--path", default=HOSPITAL_SNAPSHOT_PATH)
+    args = parser.parse_args()
+    if not args.path:
+        parser.error("--path is required when HOSPITAL_SNAPSHOT_PATH is not set")
+    asyncio.run(_main(args.path))
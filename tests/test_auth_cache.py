@@ -0,0 +1,54 @@
+"""Revocation list and UserChangeListener handlers; no database needed."""
+import time
+
+from login.auth_cache import (
+    RevocationList,
+    principal_cache,
+    revocations,
+    session_gens,
+    user_change_listener,
+)
+
+
+def test_mark_makes_older_tokens_suspect():
+    marks = RevocationList(ttl_seconds=60)
+    issued = time.time() - 1
+    marks.mark(1)
+    assert marks.is_suspect(1, issued)
+    assert not marks.is_suspect(1, time.time() + 1)
+    assert not marks.is_suspect(2, issued)
+
+
+def test_mark_all_covers_every_user_until_the_ttl():
+    marks = RevocationList(ttl_seconds=0.05)
+    issued = time.time() - 1
+    marks.mark_all()
+    assert marks.is_suspect(1, issued) and marks.is_suspect(2, issued)
+    time.sleep(0.1)
+    assert not marks.is_suspect(1, issued)
+
+
+def test_revoked_notify_drops_the_user_and_marks_their_tokens():
+    issued = time.time() - 1
+    session_gens.set(7, 0)
+    session_gens.set(8, 0)
+    user_change_listener.on_notify("revoked:7")
+    assert session_gens.get(7) is None
+    assert session_gens.get(8) == 0
+    assert revocations.is_suspect(7, issued)
+    assert not revocations.is_suspect(8, issued)
+
+
+def test_updated_notify_keeps_the_session_generation():
+    session_gens.set(9, 3)
+    user_change_listener.on_notify("updated:9")
+    assert session_gens.get(9) == 3
+    assert not revocations.is_suspect(9, time.time() - 1)
+
+
+def test_reconnect_distrusts_everything_cached_or_issued():
+    session_gens.set(10, 1)
+    user_change_listener.on_reconnect()
+    assert session_gens.get(10) is None
+    assert revocations.is_suspect(11, time.time() - 1)
+    assert principal_cache.stats()["size"] == 0
@@ -0,0 +1,138 @@
+"""AutoCallDispatcher on a fake provider; no database needed."""
+import asyncio
+
+import pytest
+
+from login.dispatch import (
+    AutoCallDispatcher,
+    CallProvider,
+    DispatchNotConfigured,
+    DispatchQueueFull,
+    FakeCallProvider,
+)
+from login.pubsub import Broker
+
+
+class CountingProvider(CallProvider):
+    """Rejects after ``delay`` seconds and records the peak number of open calls."""
+
+    def __init__(self, delay: float) -> None:
+        self.delay = delay
+        self.open = 0
+        self.peak = 0
+
+    async def call(self, hospital_id, job) -> bool:
+        self.open += 1
+        self.peak = max(self.peak, self.open)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.open -= 1
+        return False
+
+
+def make_dispatcher(provider, **kwargs) -> AutoCallDispatcher:
+    options = dict(workers=1, queue_size=10, max_parallel=5, call_timeout=5, job_ttl=60)
+    options.update(kwargs)
+    return AutoCallDispatcher(provider=provider, events=Broker(queue_size=64), **options)
+
+
+async def wait_done(dispatcher, job, timeout=5.0):
+    async def poll():
+        while not job.done:
+            await asyncio.sleep(0.01)
+
+    await asyncio.wait_for(poll(), timeout)
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_first_accept_cancels_the_other_attempts():
+    async def scenario():
+        dispatcher = make_dispatcher(FakeCallProvider(delay=0.05, accept_ids={2}), max_parallel=2)
+        await dispatcher.start()
+        try:
+            job = dispatcher.submit(user_id=1, hospital_ids=[1, 2, 3, 4])
+            await wait_done(dispatcher, job)
+        finally:
+            await dispatcher.stop()
+        return job
+
+    job = run(scenario())
+    assert job.status == "accepted"
+    assert job.accepted_hospital_id == 2
+    assert job.attempts[1].status == "rejected"
+    assert job.attempts[2].status == "accepted"
+    # 3 was dialing and 4 still waiting for a slot when 2 accepted
+    assert {job.attempts[3].status, job.attempts[4].status} == {"cancelled"}
+
+
+def test_max_parallel_bounds_open_calls():
+    provider = CountingProvider(delay=0.02)
+
+    async def scenario():
+        dispatcher = make_dispatcher(provider, max_parallel=2)
+        await dispatcher.start()
+        try:
+            job = dispatcher.submit(user_id=1, hospital_ids=list(range(1, 8)))
+            await wait_done(dispatcher, job)
+        finally:
+            await dispatcher.stop()
+        return job
+
+    job = run(scenario())
+    assert job.status == "exhausted"
+    assert provider.peak == 2
+
+
+def test_full_queue_rejects_submissions():
+    async def scenario():
+        dispatcher = make_dispatcher(FakeCallProvider(delay=0.01), queue_size=1)
+        await dispatcher.start()
+        try:
+            # no await in between, so the worker has not taken the first job yet
+            dispatcher.submit(user_id=1, hospital_ids=[1])
+            with pytest.raises(DispatchQueueFull):
+                dispatcher.submit(user_id=1, hospital_ids=[2])
+        finally:
+            await dispatcher.stop()
+
+    run(scenario())
+
+
+def test_finished_jobs_expire_but_running_jobs_stay():
+    async def scenario():
+        dispatcher = make_dispatcher(FakeCallProvider(delay=0.2, accept_ids=set()), job_ttl=0.05)
+        await dispatcher.start()
+        try:
+            job = dispatcher.submit(user_id=1, hospital_ids=[1])
+            await asyncio.sleep(0.1)
+            assert dispatcher.get(job.id) is job  # running: older than the TTL, still pinned
+            await wait_done(dispatcher, job)
+            assert dispatcher.get(job.id) is job
+            await asyncio.sleep(0.1)
+            assert dispatcher.get(job.id) is None
+        finally:
+            await dispatcher.stop()
+
+    run(scenario())
+
+
+def test_no_provider_refuses_triggers():
+    async def scenario():
+        dispatcher = make_dispatcher(None)
+        await dispatcher.start()
+        try:
+            with pytest.raises(DispatchNotConfigured):
+                dispatcher.submit(user_id=1, hospital_ids=[1])
+        finally:
+            await dispatcher.stop()
+
+    run(scenario())
+
+
+def test_queue_size_must_be_positive():
+    with pytest.raises(ValueError):
+        make_dispatcher(FakeCallProvider(), queue_size=0)
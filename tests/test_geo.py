@@ -0,0 +1,82 @@
+"""KDTree and HospitalGeoIndex against a brute-force haversine scan; no database needed."""
+import random
+
+import pytest
+
+from login import geo
+from login.geo import HospitalGeoIndex, KDTree, haversine_km, to_unit_vector
+
+
+def make_rows(n: int, seed: int = 7) -> list[tuple[int, float, float, bool]]:
+    rng = random.Random(seed)
+    # mostly around Korea, a few far away (and across the antimeridian)
+    rows = [
+        (i, rng.uniform(33.0, 38.5), rng.uniform(125.0, 130.0), rng.random() < 0.6)
+        for i in range(1, n - 9)
+    ]
+    rows += [(i, rng.uniform(-60, 60), rng.uniform(-180, 180), True) for i in range(n - 9, n + 1)]
+    return rows
+
+
+def brute_force(rows, lat, lon, k, accept=lambda row: True) -> list[int]:
+    ranked = sorted((haversine_km(lat, lon, r[1], r[2]), r[0]) for r in rows if accept(r))
+    return [i for _d, i in ranked[:k]]
+
+
+TARGETS = [(37.5665, 126.978), (35.1, 129.04), (33.0, 125.0), (0.0, 179.9), (-45.0, -70.0)]
+
+
+@pytest.mark.parametrize("k", [1, 5, 40])
+def test_tree_nearest_is_exact(k):
+    rows = make_rows(500)
+    tree = KDTree([r[0] for r in rows], [to_unit_vector(r[1], r[2]) for r in rows])
+    for lat, lon in TARGETS:
+        hits = tree.nearest(to_unit_vector(lat, lon), k)
+        assert [i for _chord, i in hits] == brute_force(rows, lat, lon, k)
+
+
+def test_tree_edge_sizes():
+    tree = KDTree([1, 2], [to_unit_vector(37.0, 127.0), to_unit_vector(38.0, 127.0)])
+    assert tree.nearest(to_unit_vector(37.1, 127.0), 0) == []
+    assert [i for _c, i in tree.nearest(to_unit_vector(37.1, 127.0), 10)] == [1, 2]
+    assert KDTree([], []).nearest((1.0, 0.0, 0.0), 3) == []
+
+
+def test_index_distances_match_haversine():
+    rows = make_rows(300)
+    index = HospitalGeoIndex(rows)
+    by_id = {r[0]: r for r in rows}
+    for hospital_id, km in index.nearest(37.5665, 126.978, 10):
+        row = by_id[hospital_id]
+        assert km == pytest.approx(haversine_km(37.5665, 126.978, row[1], row[2]), abs=1e-6)
+
+
+def test_open_only_walks_the_filtered_tree():
+    rows = make_rows(500)
+    index = HospitalGeoIndex(rows)
+    # more than GEO_SCAN_FRACTION of the points are open
+    assert len(index.open_ids) > len(index) * geo.GEO_SCAN_FRACTION
+    for lat, lon in TARGETS:
+        hits = index.nearest(lat, lon, 8, open_only=True)
+        assert [i for i, _km in hits] == brute_force(rows, lat, lon, 8, lambda r: r[3])
+
+
+def test_small_candidate_sets_are_scanned():
+    rows = make_rows(500)
+    index = HospitalGeoIndex(rows)
+    wanted = set(random.Random(1).sample([r[0] for r in rows], 20)) | {10_000}
+    for lat, lon in TARGETS:
+        hits = index.nearest(lat, lon, 5, hospital_ids=wanted)
+        assert [i for i, _km in hits] == brute_force(rows, lat, lon, 5, lambda r: r[0] in wanted)
+        hits = index.nearest(lat, lon, 5, open_only=True, hospital_ids=wanted)
+        expected = brute_force(rows, lat, lon, 5, lambda r: r[0] in wanted and r[3])
+        assert [i for i, _km in hits] == expected
+
+
+def test_set_open_changes_the_filter():
+    rows = [(1, 37.0, 127.0, False), (2, 38.0, 127.0, True)]
+    index = HospitalGeoIndex(rows)
+    assert [i for i, _km in index.nearest(37.0, 127.0, 1, open_only=True)] == [2]
+    index.set_open(1, True)
+    index.set_open(99, True)  # not in the index: ignored
+    assert [i for i, _km in index.nearest(37.0, 127.0, 1, open_only=True)] == [1]
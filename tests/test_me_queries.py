@@ -0,0 +1,96 @@
+"""
+GET /me query budget. Needs DATABASE_URL pointing at a database initialized
+from login/db_init.sql; skipped otherwise.
+"""
+import asyncio
+import uuid
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event, text
+
+from login import db, security
+from login.app import app
+from login.auth_cache import session_gens
+
+P = "/api/v1"
+
+
+def _db_reachable() -> bool:
+    async def ping():
+        async with db.engine.connect() as conn:
+            await conn.execute(text("SELECT 1 FROM users LIMIT 1"))
+        await db.engine.dispose()
+
+    try:
+        asyncio.run(ping())
+    except Exception:
+        return False
+    return True
+
+
+pytestmark = pytest.mark.skipif(not _db_reachable(), reason="database not reachable")
+
+
+@pytest.fixture
+def statements():
+    executed = []
+
+    def count(conn, cursor, statement, *args):
+        executed.append(statement)
+
+    event.listen(db.engine.sync_engine, "before_cursor_execute", count)
+    yield executed
+    event.remove(db.engine.sync_engine, "before_cursor_execute", count)
+
+
+@pytest.fixture
+def client():
+    with TestClient(app) as c:
+        email = f"me-{uuid.uuid4().hex[:12]}@example.com"
+        assert c.post(P + "/auth/register", json={"email": email, "password": "pw"}).status_code == 201
+        login = {"email": email, "password": "pw"}
+        c.headers["Authorization"] = f"Bearer {c.post(P + '/auth/login', json=login).json()['access_token']}"
+        yield c
+        # a fresh token, in case the test revoked the first one
+        c.headers["Authorization"] = f"Bearer {c.post(P + '/auth/login', json=login).json()['access_token']}"
+        assert c.delete(P + "/me").status_code == 204
+
+
+@pytest.fixture
+def stateless(monkeypatch):
+    monkeypatch.setattr(security, "AUTH_MODE", "stateless")
+
+
+def test_me_issues_at_most_one_statement(client, statements):
+    session_gens.clear()
+    r = client.get(P + "/me")
+    assert r.status_code == 200
+    assert len(statements) <= 1, statements
+
+
+def test_me_warm_issues_at_most_one_statement(client, statements, stateless):
+    client.get(P + "/me")
+    statements.clear()
+    assert client.get(P + "/me").status_code == 200
+    assert len(statements) <= 1, statements
+
+
+def test_me_is_fresh_in_stateless_mode(client, stateless):
+    before = client.get(P + "/me").json()
+    updated = client.patch(P + "/me", json={}).json()
+    assert updated["updated_at"] != before["updated_at"]
+    assert client.get(P + "/me").json()["updated_at"] == updated["updated_at"]
+
+
+def test_stateless_auth_needs_no_query_after_gen_cache_expiry(client, statements, stateless):
+    session_gens.clear()
+    # a route that authenticates with get_current_user and reads nothing else
+    assert client.get(P + "/auto-call/missing").status_code == 404
+    assert statements == []
+
+
+def test_stateless_logout_all_revokes_tokens(client, stateless):
+    assert client.post(P + "/auth/logout-all").status_code == 200
+    session_gens.clear()
+    assert client.get(P + "/auto-call/missing").status_code == 401
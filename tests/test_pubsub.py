@@ -0,0 +1,59 @@
+"""Broker fan-out and drop-oldest overflow; no database needed."""
+import asyncio
+
+from login.pubsub import Broker
+
+
+def queued(sub) -> list[dict]:
+    out = []
+    while not sub.queue.empty():
+        out.append(sub.queue.get_nowait())
+    return out
+
+
+def test_a_full_queue_drops_the_oldest_events():
+    broker = Broker(queue_size=2)
+    slow = broker.subscribe("beds")
+    for n in range(5):
+        broker.publish("beds", {"n": n})
+    assert queued(slow) == [{"n": 3}, {"n": 4}]
+    assert slow.take_dropped() == 3
+    assert slow.take_dropped() == 0
+    assert broker.stats() == {"topics": 1, "subscribers": 1, "published": 5, "dropped": 3}
+
+
+def test_each_subscriber_overflows_on_its_own():
+    broker = Broker(queue_size=2)
+    slow, fast = broker.subscribe("beds"), broker.subscribe("beds")
+    other = broker.subscribe("jobs")
+    for n in range(3):
+        broker.publish("beds", {"n": n})
+        queued(fast)
+    assert (slow.dropped, fast.dropped) == (1, 0)
+    assert other.queue.empty()
+
+
+def test_drain_and_unsubscribe():
+    broker = Broker(queue_size=4)
+    sub = broker.subscribe("beds")
+    broker.publish("beds", {"n": 1})
+    broker.publish("beds", {"n": 2})
+    assert sub.drain() == 2 and sub.queue.empty()
+    broker.unsubscribe(sub)
+    broker.unsubscribe(sub)  # twice is harmless
+    broker.publish("beds", {"n": 3})
+    assert sub.queue.empty()
+    assert broker.stats()["topics"] == 0
+
+
+def test_get_waits_for_the_next_event():
+    async def scenario():
+        broker = Broker(queue_size=4)
+        sub = broker.subscribe("beds")
+        waiter = asyncio.create_task(sub.get())
+        await asyncio.sleep(0)
+        assert not waiter.done()
+        broker.publish("beds", {"n": 1})
+        return await asyncio.wait_for(waiter, 1)
+
+    assert asyncio.run(scenario()) == {"n": 1}
@@ -0,0 +1,84 @@
+"""ranking.HospitalColumns on hand-built rows; no database needed."""
+import math
+import random
+
+import pytest
+
+from login.geo import haversine_km
+from login.ranking import HospitalColumns, RankingWeights
+
+# id, is_open, er_beds, operating_rooms, latitude, longitude
+ROWS = [
+    (30, True, 3, None, 37.50, 127.00),
+    (10, False, None, 2, 37.40, 126.90),
+    (20, True, 0, 1, None, None),
+]
+
+
+def brute_force(rows, ids, weights, lat=None, lon=None):
+    """(id, score, distance) per candidate, scored one row at a time."""
+    wanted = [r for r in rows if r[0] in set(ids)]
+    max_beds = max([r[2] or 0 for r in wanted] + [1])
+    max_rooms = max([r[3] or 0 for r in wanted] + [1])
+    ranked = []
+    for hid, is_open, beds, rooms, h_lat, h_lon in wanted:
+        score = weights.is_open * is_open
+        score += weights.er_beds * (beds or 0) / max_beds
+        score += weights.operating_rooms * (rooms or 0) / max_rooms
+        distance = None
+        if lat is not None and h_lat is not None:
+            distance = haversine_km(lat, lon, h_lat, h_lon)
+            score += weights.distance * math.exp(-distance / weights.distance_scale_km)
+        ranked.append((hid, score, distance))
+    return sorted(ranked, key=lambda r: (-r[1], r[0]))
+
+
+def test_bed_status_keeps_the_requested_order():
+    columns = HospitalColumns(ROWS)
+    statuses = columns.bed_status([20, 99, 30, 10, 20])
+    assert [s["hospital_id"] for s in statuses] == [20, 30, 10]
+    assert statuses[1] == {"hospital_id": 30, "is_open": True, "er_beds": 3, "operating_rooms": None}
+    assert columns.bed_status([]) == []
+
+
+def test_rank_without_location():
+    ranked = HospitalColumns(ROWS).rank([10, 20, 30, 30, 99], RankingWeights())
+    # 30: open + all the beds; 20: open + half the rooms; 10: closed + all the rooms
+    assert [(r.hospital_id, r.score, r.distance_km) for r in ranked] == [
+        (30, 7.0, None),
+        (20, 5.5, None),
+        (10, 1.0, None),
+    ]
+
+
+def test_rank_ties_go_to_the_lower_id():
+    rows = [(5, True, 1, 1, None, None), (4, True, 1, 1, None, None)]
+    assert [r.hospital_id for r in HospitalColumns(rows).rank([5, 4], RankingWeights())] == [4, 5]
+
+
+def test_rank_matches_a_row_by_row_score():
+    rng = random.Random(3)
+    rows = [
+        (
+            i,
+            rng.random() < 0.7,
+            rng.choice([None, *range(10)]),
+            rng.choice([None, *range(4)]),
+            *((None, None) if rng.random() < 0.1 else (rng.uniform(33, 38), rng.uniform(125, 130))),
+        )
+        for i in range(1, 201)
+    ]
+    columns = HospitalColumns(rows)
+    weights = RankingWeights(distance=4.0, er_beds=1.5, operating_rooms=0.5, is_open=2.0)
+    ids = rng.sample(range(1, 251), 80)  # some unknown
+    ranked = columns.rank(ids, weights, lat=37.5665, lon=126.978, limit=25)
+    expected = brute_force(rows, ids, weights, lat=37.5665, lon=126.978)[:25]
+    assert [r.hospital_id for r in ranked] == [e[0] for e in expected]
+    for r, (_hid, score, distance) in zip(ranked, expected):
+        assert r.score == pytest.approx(score)
+        assert r.distance_km == (None if distance is None else pytest.approx(distance))
+
+
+def test_rank_of_nothing_known():
+    assert HospitalColumns(ROWS).rank([1, 2], RankingWeights()) == []
+    assert HospitalColumns(ROWS).rank([], RankingWeights()) == []
@@ -0,0 +1,77 @@
+"""HospitalSearchIndex n-gram and chosung matching; no database needed."""
+from login.search import (
+    HospitalSearchIndex,
+    is_chosung_query,
+    normalize,
+    query_terms,
+    to_chosung,
+)
+
+NAMES = {
+    1: "서울대학교병원",
+    2: "서울성모병원",
+    3: "삼성서울병원",
+    4: "Seoul Clinic",
+    5: "부산대학교병원",
+    6: "서울 아산 병원",
+    7: "ＫＭＣ 의원",
+}
+
+
+def build():
+    return HospitalSearchIndex.build(list(NAMES.items()))
+
+
+def brute_force(q: str) -> set[int]:
+    """Ids whose name holds every query term: on initials for chosung terms."""
+    terms = query_terms(q)
+    found = set()
+    for i, name in NAMES.items():
+        compact = normalize(name)
+        if all(t in (to_chosung(compact) if is_chosung_query(t) else compact) for t in terms):
+            found.add(i)
+    return found
+
+
+def test_substring_matches_equal_a_full_scan():
+    index = build()
+    queries = set()
+    for name in NAMES.values():
+        compact = normalize(name)
+        queries.update(compact[i : i + n] for n in (1, 2, 3) for i in range(len(compact) - n + 1))
+    for q in sorted(queries):
+        assert set(index.search(q)) == brute_force(q), q
+
+
+def test_prefix_and_shorter_names_rank_first():
+    index = build()
+    ids = index.search("서울")
+    assert set(ids) == {1, 2, 3, 6}
+    assert ids[-1] == 3  # the only one that does not start with 서울
+
+
+def test_spacing_width_and_case_are_ignored():
+    index = build()
+    assert index.search("서울아산병원") == [6]
+    assert index.search("seoul  CLINIC") == [4]
+    assert index.search("kmc") == [7]
+
+
+def test_every_term_must_match():
+    index = build()
+    assert set(index.search("서울 병원")) == {1, 2, 3, 6}
+    assert index.search("부산 성모") == []
+
+
+def test_chosung_queries_match_initials():
+    index = build()
+    assert index.search("ㅅㅇㄷ") == [1]
+    assert index.search("ㅂㅅ") == [5]
+    assert set(index.search("ㅅㅇ")) == brute_force("ㅅㅇ") == {1, 2, 3, 6}
+
+
+def test_fuzzy_fallback_when_nothing_contains_the_query():
+    index = build()
+    assert index.search("서울대병원") == [1]
+    assert index.search("xyz") == []
+    assert index.search("  ") == []
@@ -0,0 +1,137 @@
+"""Snapshot file format and SnapshotStore modes; no database needed."""
+import os
+import time
+
+import pytest
+
+from login.snapshot import (
+    HEADER,
+    MAGIC,
+    VERSION,
+    HospitalSnapshot,
+    SnapshotError,
+    SnapshotHospital,
+    SnapshotStore,
+    _layout,
+    write_snapshot,
+)
+
+# SnapshotHospital field order, deliberately not sorted by id
+ROWS = [
+    (3, "서울대학교병원", True, 1.5, "서울 종로구 대학로 101", 37.58, 127.0, 4, 2),
+    (1, "Mercy Clinic", False, None, None, None, None, None, None),
+    (2, "", True, 0.0, "", 35.1, 129.0, 0, 0),
+]
+
+
+def _write(path, rows=ROWS, built_at=1234.5):
+    return write_snapshot(rows, str(path), built_at)
+
+
+def test_round_trip_keeps_every_field_and_null(tmp_path):
+    path = tmp_path / "hospitals.snap"
+    assert _write(path) == 3
+    snapshot = HospitalSnapshot(str(path))
+    assert len(snapshot) == 3
+    assert snapshot.built_at == 1234.5
+    assert snapshot.rows(range(3)) == [SnapshotHospital(*r) for r in sorted(ROWS)]
+    # an empty address is not NULL
+    assert snapshot.get(2).address == ""
+    assert snapshot.get(1).address is None
+
+
+def test_header_and_aligned_sections(tmp_path):
+    path = tmp_path / "hospitals.snap"
+    _write(path)
+    data = path.read_bytes()
+    heap = "".join(r[1] for r in ROWS).encode() + "".join(r[4] or "" for r in ROWS).encode()
+    assert HEADER.unpack_from(data) == (MAGIC, VERSION, 3, len(heap), 1234.5)
+    layout, heap_offset = _layout(3)
+    assert len(data) == heap_offset + len(heap)
+    snapshot = HospitalSnapshot(str(path))
+    for name, (dtype, offset, count) in layout.items():
+        assert offset % 8 == 0
+        column = getattr(snapshot, name)
+        assert (column.dtype, len(column)) == (dtype, count)
+        # a view into the mapping, not a copy
+        assert not column.flags.owndata and not column.flags.writeable
+
+
+def test_lookups_follow_id_order(tmp_path):
+    path = tmp_path / "hospitals.snap"
+    _write(path)
+    snapshot = HospitalSnapshot(str(path))
+    assert snapshot.get(99) is None
+    assert [r.id for r in snapshot.page(1, 5)] == [2, 3]
+    assert snapshot.page(5, 5) == []
+    assert [r.id for r in snapshot.after(None, 2)] == [1, 2]
+    assert [r.id for r in snapshot.after(2, 5)] == [3]
+    assert [r.id for r in snapshot.by_ids([3, 99, 1])] == [3, 1]
+    assert snapshot.search("MERCY") == [1]
+    assert snapshot.search("대학") == [3]
+
+
+@pytest.mark.parametrize("damage", ["truncate", "magic"])
+def test_damaged_files_are_rejected(tmp_path, damage):
+    path = tmp_path / "hospitals.snap"
+    _write(path)
+    data = path.read_bytes()
+    path.write_bytes(data[:-1] if damage == "truncate" else b"XXXX" + data[4:])
+    with pytest.raises(SnapshotError):
+        HospitalSnapshot(str(path))
+
+
+def test_replace_swaps_the_mapping_and_keeps_the_old_one_readable(tmp_path):
+    path = tmp_path / "hospitals.snap"
+    store = SnapshotStore(str(path), "primary", check_sec=0, fallback_sec=30)
+    assert store.current() is None  # not built yet
+    _write(path)
+    first = store.current()
+    _write(path, ROWS[:1])
+    second = store.current()
+    assert second is not first and len(second) == 1
+    assert first.get(2).address == ""  # requests holding the old mapping finish on it
+    assert store.swaps == 2
+    assert os.listdir(tmp_path) == ["hospitals.snap"]  # no temporary file left behind
+
+    # a damaged replacement is counted and the current mapping stays
+    (tmp_path / "broken").write_bytes(b"HSNP")
+    os.replace(tmp_path / "broken", path)
+    assert store.current() is second
+    assert store.load_errors == 1
+
+
+def test_off_mode_never_serves(tmp_path):
+    path = tmp_path / "hospitals.snap"
+    _write(path)
+    for store in (
+        SnapshotStore(str(path), "off", check_sec=0, fallback_sec=30),
+        SnapshotStore("", "primary", check_sec=0, fallback_sec=30),
+    ):
+        assert store.mode == "off"
+        assert store.current() is None and store.for_reads() is None
+        assert not store.mark_db_degraded()
+
+
+def test_primary_mode_serves_whenever_loaded(tmp_path):
+    path = tmp_path / "hospitals.snap"
+    _write(path)
+    store = SnapshotStore(str(path), "primary", check_sec=0, fallback_sec=30)
+    assert store.for_reads() is store.current()
+    assert not store.mark_db_degraded()
+    assert not store.db_degraded()
+
+
+def test_fallback_mode_serves_only_while_degraded(tmp_path):
+    path = tmp_path / "hospitals.snap"
+    store = SnapshotStore(str(path), "fallback", check_sec=0, fallback_sec=0.05)
+    assert not store.mark_db_degraded()  # nothing to fall back to yet
+    _write(path)
+    assert store.for_reads() is None
+    assert store.mark_db_degraded()
+    assert store.db_degraded()
+    assert store.for_reads() is store.current()
+    assert store.fallback_reads == 1
+    time.sleep(0.1)
+    assert not store.db_degraded()
+    assert store.for_reads() is None